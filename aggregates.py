@@ -0,0 +1,194 @@
+"""
+Materialised time-series aggregates of an issues CSV, kept up to date by the
+crawlers so dashboards read small precomputed tables instead of the history.
+
+Every view is a table of counts (items per month created, per month closed,
+per hour/weekday/month of creation, per (month, author)), saved as Parquet
+under ``<csv>.views/``. Counts are additive, so an incremental sync updates
+them in place: ``sync.upsert_pages`` adds every incoming row and subtracts
+the stored row it replaces. An issue that was open and is now closed thus
+moves out of nothing and into its closing month, and one that was reopened
+moves back out. A full crawl rebuilds the views from the new CSV, and views
+saved for other contents of the CSV (say, another export copied over it) are
+rebuilt when they are loaded.
+"""
+
+import csv
+import io
+import json
+import os
+
+import pandas as pd
+
+from issue_writer import COLUMNS
+from loader import file_hash, file_version, iter_issues, parse_columns
+
+# What the views are computed from
+VIEW_COLUMNS = ["created_at", "closed_at", "author"]
+
+
+def _month(dates):
+    return dates.dt.strftime("%Y-%m")
+
+
+# name -> function of a typed frame returning the key(s) to count
+VIEWS = {
+    "created_by_month": lambda df: _month(df["created_at"]),
+    "closed_by_month": lambda df: _month(df["closed_at"]),
+    "created_by_hour": lambda df: df["created_at"].dt.hour,
+    "created_by_dayofweek": lambda df: df["created_at"].dt.dayofweek,
+    "created_by_month_of_year": lambda df: df["created_at"].dt.month,
+    "authors_by_month": lambda df: pd.DataFrame(
+        {"month": _month(df["created_at"]), "author": df["author"]}
+    ),
+}
+
+
+def views_path(path):
+    return f"{path}.views"
+
+
+def _source_path(path):
+    return os.path.join(views_path(path), "source.json")
+
+
+def _is_current(path):
+    """Whether the saved views were computed from the current contents of ``path``."""
+    try:
+        with open(_source_path(path), encoding="utf-8") as f:
+            source = json.load(f)
+    except (OSError, ValueError):
+        return False
+    # Same mtime and size is taken as unchanged; otherwise compare contents
+    if tuple(source["version"]) == file_version(path):
+        return True
+    return source["sha256"] == file_hash(path)
+
+
+def _frame(rows):
+    """Type a crawled page or a list of CSV rows for the views."""
+    if isinstance(rows, pd.DataFrame):
+        df = rows[VIEW_COLUMNS].copy()
+    else:
+        # CSV rows are all text and may predate later columns; parse them
+        # back like the loader does
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        df = pd.read_csv(
+            buffer, header=None, names=COLUMNS, usecols=VIEW_COLUMNS, dtype=str
+        )
+    return parse_columns(df)
+
+
+class Views:
+    """The counts of every view of one CSV, as Series keyed like VIEWS."""
+
+    def __init__(self, counts=None):
+        self.counts = counts or {name: pd.Series(dtype="int64") for name in VIEWS}
+
+    def _apply(self, df, sign):
+        for name, key in VIEWS.items():
+            counts = key(df).value_counts()
+            if not len(counts):
+                continue
+            current = self.counts[name]
+            # An empty view has no index levels to align (month, author) on
+            merged = (
+                sign * counts
+                if current.empty
+                else current.add(sign * counts, fill_value=0)
+            )
+            # Keys whose items all moved elsewhere disappear
+            self.counts[name] = merged[merged != 0].astype("int64")
+
+    def add(self, rows):
+        """Count a page of rows, given as a frame or as row lists."""
+        self._apply(_frame(rows), 1)
+
+    def remove(self, rows):
+        """Uncount rows that are being replaced, e.g. by a newer version."""
+        self._apply(_frame(rows), -1)
+
+    def save(self, path):
+        directory = views_path(path)
+        os.makedirs(directory, exist_ok=True)
+        for name, counts in self.counts.items():
+            table = counts.rename("count").reset_index()
+            if name != "authors_by_month":
+                table.columns = ["key", "count"]
+            tmp = os.path.join(directory, f"{name}.parquet.tmp")
+            table.to_parquet(tmp, index=False)
+            os.replace(tmp, os.path.join(directory, f"{name}.parquet"))
+
+        # Record which version of the CSV the views describe, last
+        tmp = f"{_source_path(path)}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": file_version(path), "sha256": file_hash(path)}, f)
+        os.replace(tmp, _source_path(path))
+
+    @classmethod
+    def read(cls, path):
+        counts = {}
+        for name in VIEWS:
+            table = pd.read_parquet(os.path.join(views_path(path), f"{name}.parquet"))
+            keys = ["month", "author"] if name == "authors_by_month" else "key"
+            counts[name] = table.set_index(keys)["count"].rename_axis(
+                None if keys == "key" else keys
+            )
+        return cls(counts)
+
+    # Read side, shaped like the results of the analyses' aggregates
+
+    def monthly(self, name):
+        """Items per month as a Series with a monthly PeriodIndex."""
+        counts = self.counts[name].sort_index()
+        return counts.set_axis(pd.PeriodIndex(counts.index, freq="M"))
+
+    def seasonal(self):
+        """Items created per hour, dayofweek and month, as analyze_seasonal_patterns."""
+        return {
+            part: self.counts[f"created_by_{name}"].sort_index()
+            for part, name in [
+                ("hour", "hour"),
+                ("dayofweek", "dayofweek"),
+                ("month", "month_of_year"),
+            ]
+        }
+
+    def monthly_unique_authors(self):
+        """Distinct authors per month of ``created_at``."""
+        pairs = self.counts["authors_by_month"]
+        months = pairs.index.get_level_values("month")
+        per_month = pd.Series(months).value_counts().sort_index()
+        return per_month.set_axis(pd.PeriodIndex(per_month.index, freq="M"))
+
+    def monthly_new_authors(self):
+        """Authors per month of their first item, as ``UserIndex.first_months``."""
+        pairs = self.counts["authors_by_month"].index.to_frame(index=False)
+        first = pairs.groupby("author")["month"].min()
+        per_month = first.value_counts().sort_index()
+        return per_month.set_axis(pd.PeriodIndex(per_month.index, freq="M"))
+
+
+def build_views(path, save=True):
+    """Compute the views of the CSV at ``path`` from scratch, chunk by chunk."""
+    views = Views()
+    for chunk in iter_issues(path, VIEW_COLUMNS):
+        views._apply(chunk, 1)
+    if save:
+        views.save(path)
+    return views
+
+
+def load_views(path):
+    """
+    Return the saved views of ``path``. They are rebuilt first if there are
+    none yet or they were computed from other contents, and empty if there
+    is no CSV.
+    """
+    if not os.path.exists(path):
+        return Views()
+    if _is_current(path):
+        return Views.read(path)
+    return build_views(path)
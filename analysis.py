@@ -1,25 +1,99 @@
+import argparse
+import itertools
+
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 from wordcloud import WordCloud
 
+import sql
+from aggregates import load_views
+from body_store import BodyStore, body_store_path
+from chunked import Mean, NuniqueByGroup, Sample, ValueCounts, aggregate
+from labels import LabelIndex
+from loader import default_path, load_issues, load_labels
+from profiling import enable, profiled, span, write_trace
+from sketches import HeavyHitters, HyperLogLogByGroup
+from store import load_store
+from terms import LabelTerms, TextTerms, frequencies
+from user_index import UserIndex, load_user_index
+
+# Bodies tokenised at once by analyze_body_word_cloud
+BODY_BATCH = 10_000
+
+
+def label_index(df=None):
+    """Return the LabelIndex of ``df``, or the shared one of the default export."""
+    return load_labels() if df is None else LabelIndex.from_series(df["labels"])
+
+
+def optional_columns(df, columns):
+    """
+    Return ``df`` (or ``columns`` of the default export) when it has
+    ``columns``, else None after saying so: the crawlers write no response
+    or commit times, so analyses of them are skipped on crawled exports.
+    """
+    if df is None:
+        try:
+            return load_issues(columns=columns)
+        except KeyError:
+            pass
+    elif all(col in df for col in columns):
+        return df
+    print(f"Skipped: the export has no {', '.join(columns)} column")
+    return None
+
+
+def query_export(name, df=None, path=None, **params):
+    """
+    Run one of ``sql.QUERIES`` in DuckDB over the export at ``path`` (by
+    default the current one) and return the result as a frame.
+    """
+    if df is not None:
+        raise ValueError("The SQL backend queries an export: pass path, not df")
+    return sql.query(name, sql.connect(path or default_path()), **params)
+
+
+def monthly_result(result, column):
+    """``column`` of a query result by month, indexed like ``to_period("M")``."""
+    months = result["month"].dt.tz_localize(None).dt.to_period("M")
+    return result[column].set_axis(pd.PeriodIndex(months)).rename(None)
+
 
-def analysis():
-    df = pd.read_csv("github_issues.csv")
-    date_columns = ["created_at", "closed_at", "updated_at"]
-    for col in date_columns:
-        df[col] = pd.to_datetime(df[col])
+def user_index(df=None, path=None):
+    """Return the UserIndex of ``df``, or the saved one of the export at ``path``."""
+    if df is None:
+        return load_user_index(path or default_path())
+    return UserIndex.from_frame(df)
+
+
+@profiled()
+def analysis(df=None, path=None):
+    """
+    Overview of the export. With ``path``, the file is read in chunks and
+    the scatter plot shows a random sample of at most SAMPLE_ROWS issues.
+    """
+    totals = aggregate(
+        {
+            "types": ValueCounts("type"),
+            "time_to_close": Mean("time_to_close_days"),
+            "created": ValueCounts("created_at", lambda c: c["created_at"].dt.date),
+            "sample": Sample(["body_length", "comments"]),
+        },
+        df,
+        path,
+    )
 
     print("Issue Type Distribution:")
-    print(df["type"].value_counts())
+    print(totals["types"])
 
     print("\nAverage Time to Close (days):")
-    print(df["time_to_close_days"].mean())
+    print(totals["time_to_close"])
 
     # Plot issue creation over time
     plt.figure(figsize=(12, 6))
-    df["created_at"].dt.date.value_counts().sort_index().plot()
+    totals["created"].sort_index().plot()
     plt.title("Issues Created Over Time")
     plt.xlabel("Date")
     plt.ylabel("Number of Issues")
@@ -27,78 +101,53 @@ def analysis():
 
     # Correlation between body length and engagement
     plt.figure(figsize=(10, 6))
-    sns.scatterplot(data=df, x="body_length", y="comments")
+    sns.scatterplot(data=totals["sample"], x="body_length", y="comments")
     plt.title("Relationship between Issue Length and Comments")
     plt.show()
 
 
-def average_time_take_to_close_pr():
+@profiled()
+def average_time_take_to_close_pr(df=None):
     """
     Calculate the average time taken to close pull requests.
     Returns the mean time in days.
     """
-    df = pd.read_csv("github_issues.csv")
+    if df is None:
+        df = load_issues(columns=["type", "time_to_close"])
 
-    # Convert date columns to datetime
-    date_columns = ["created_at", "closed_at"]
-    for col in date_columns:
-        df[col] = pd.to_datetime(df[col])
+    # Open PRs have no time to close and are skipped by mean()
+    time_to_close = df.loc[df["type"] == "pull_request", "time_to_close"]
 
-    # Filter for PRs only and those that are closed
-    pr_df = df[(df["type"] == "pull_request") & (df["closed_at"].notna())]
+    return time_to_close.mean()
 
-    # Calculate time to close
-    pr_df["time_to_close"] = (
-        pr_df["closed_at"] - pr_df["created_at"]
-    ).dt.total_seconds() / (24 * 60 * 60)
 
-    return pr_df["time_to_close"].mean()
-
-
-def average_time_take_to_close_issue():
+@profiled()
+def average_time_take_to_close_issue(df=None):
     """
     Calculate the average time taken to close issues (excluding PRs).
     Returns the mean time in days.
     """
-    df = pd.read_csv("github_issues.csv")
+    if df is None:
+        df = load_issues(columns=["type", "time_to_close"])
 
-    # Convert date columns to datetime
-    date_columns = ["created_at", "closed_at"]
-    for col in date_columns:
-        df[col] = pd.to_datetime(df[col])
+    # Open issues have no time to close and are skipped by mean()
+    time_to_close = df.loc[df["type"] == "issue", "time_to_close"]
 
-    # Filter for issues only and those that are closed
-    issue_df = df[(df["type"] == "issue") & (df["closed_at"].notna())]
+    return time_to_close.mean()
 
-    # Calculate time to close
-    issue_df["time_to_close"] = (
-        issue_df["closed_at"] - issue_df["created_at"]
-    ).dt.total_seconds() / (24 * 60 * 60)
 
-    return issue_df["time_to_close"].mean()
-
-
-def number_of_days_for_each_issue():
+@profiled()
+def number_of_days_for_each_issue(df=None):
     """Create a plot showing the distribution of days taken to close issues"""
-    import matplotlib.pyplot as plt
-    from datetime import datetime
-
-    df = pd.read_csv("github_issues.csv")
-
-    # Convert date columns to datetime
-    date_columns = ["created_at", "closed_at"]
-    for col in date_columns:
-        df[col] = pd.to_datetime(df[col])
+    if df is None:
+        df = load_issues(columns=["type", "time_to_close"])
 
     # Filter for issues only and those that are closed
-    issue_df = df[(df["type"] == "issue") & (df["closed_at"].notna())]
-    issue_df["time_to_close"] = (
-        issue_df["closed_at"] - issue_df["created_at"]
-    ).dt.total_seconds() / (24 * 60 * 60)
+    time_to_close = df.loc[df["type"] == "issue", "time_to_close"].dropna()
 
     # Create the plot
     plt.figure(figsize=(12, 6))
-    plt.hist(issue_df["time_to_close"], bins=30, color="skyblue", edgecolor="black")
+    plt.hist(time_to_close, bins=30, color="skyblue", edgecolor="black")
     plt.title("Distribution of Days Taken to Close Issues")
     plt.xlabel("Number of Days")
     plt.ylabel("Number of Issues")
@@ -108,20 +157,35 @@ def number_of_days_for_each_issue():
     plt.show()
 
 
-def most_active_issue_creators(top_n=10):
+@profiled()
+def most_active_issue_creators(
+    top_n=10, df=None, path=None, approximate=False, backend="pandas"
+):
     """
     Find users who opened the most issues.
     Args:
         top_n: Number of top users to return (default: 10)
+        path: Count over this export in chunks instead of loading it
+        approximate: Count in constant memory with a HeavyHitters sketch
+        backend: "pandas", or "sql" to count in DuckDB (sql.py)
     """
-    df = pd.read_csv("github_issues.csv")
-    
-    # Filter for issues only
-    issues_df = df[df["type"] == "issue"]
-    
     # Count issues by user
-    issue_counts = issues_df["author"].value_counts()
-    
+    if backend == "sql":
+        issue_counts = query_export(
+            "top_authors", df, path, type="issue", n=top_n
+        ).set_index("author")["count"]
+    else:
+        counter = HeavyHitters if approximate else ValueCounts
+        issue_counts = aggregate(
+            {
+                "issues": counter(
+                    ["type", "author"], lambda c: c.loc[c["type"] == "issue", "author"]
+                )
+            },
+            df,
+            path,
+        )["issues"]
+
     # Create visualization
     plt.figure(figsize=(12, 6))
     issue_counts.head(top_n).plot(kind='bar')
@@ -131,26 +195,44 @@ def most_active_issue_creators(top_n=10):
     plt.xticks(rotation=45, ha='right')
     plt.tight_layout()
     plt.show()
-    
+
     return issue_counts.head(top_n)
 
 
-def most_active_pr_authors(top_n=10):
+@profiled()
+def most_active_pr_authors(
+    top_n=10, df=None, path=None, approximate=False, backend="pandas"
+):
     """
     Find users with the most merged pull requests.
     Args:
         top_n: Number of top users to return (default: 10)
+        path: Count over this export in chunks instead of loading it
+        approximate: Count in constant memory with a HeavyHitters sketch
+        backend: "pandas", or "sql" to count in DuckDB (sql.py)
     Works good.
     """
+    # Count merged PRs by user
+    if backend == "sql":
+        pr_counts = query_export(
+            "top_merged_pr_authors", df, path, n=top_n
+        ).set_index("author")["count"]
+    else:
+        counter = HeavyHitters if approximate else ValueCounts
+        pr_counts = aggregate(
+            {
+                "prs": counter(
+                    ["type", "state", "author"],
+                    lambda c: c.loc[
+                        (c["type"] == "pull_request") & (c["state"] == "MERGED"),
+                        "author",
+                    ],
+                )
+            },
+            df,
+            path,
+        )["prs"]
 
-    df = pd.read_csv("github_issues.csv")
-    
-    # Filter for merged PRs only
-    merged_prs_df = df[(df["type"] == "pull_request") & (df["state"] == "MERGED")]
-    
-    # Count PRs by user
-    pr_counts = merged_prs_df["author"].value_counts()
-    
     # Create visualization
     plt.figure(figsize=(12, 6))
     pr_counts.head(top_n).plot(kind='bar')
@@ -160,17 +242,16 @@ def most_active_pr_authors(top_n=10):
     plt.xticks(rotation=45, ha='right')
     plt.tight_layout()
     plt.show()
-    
+
     return pr_counts.head(top_n)
 
 
-def analyze_issue_labels(top_n=10):
+@profiled()
+def analyze_issue_labels(top_n=10, df=None):
     """Analyze the most common issue labels and their distribution"""
-    df = pd.read_csv("github_issues.csv")
-    
-    # Assuming labels are stored as a string list, might need preprocessing
-    label_counts = df["labels"].value_counts()
-    
+    # Counts individual labels rather than comma-joined combinations
+    label_counts = label_index(df).counts()
+
     plt.figure(figsize=(12, 6))
     label_counts.head(top_n).plot(kind='bar')
     plt.title(f"Top {top_n} Most Common Issue Labels")
@@ -179,34 +260,33 @@ def analyze_issue_labels(top_n=10):
     plt.xticks(rotation=45, ha='right')
     plt.tight_layout()
     plt.show()
-    
+
     return label_counts.head(top_n)
 
 
-def analyze_first_response_time():
+@profiled()
+def analyze_first_response_time(df=None):
     """Analyze how long it takes to get the first response on issues"""
-    df = pd.read_csv("github_issues.csv")
-    
-    df["created_at"] = pd.to_datetime(df["created_at"])
-    df["first_response_at"] = pd.to_datetime(df["first_response_at"])
-    
-    df["response_time_days"] = (
-        df["first_response_at"] - df["created_at"]
-    ).dt.total_seconds() / (24 * 60 * 60)
-    
+    df = optional_columns(df, ["time_to_first_response"])
+    if df is None:
+        return
+
+    response_time_days = df["time_to_first_response"]
+
     plt.figure(figsize=(12, 6))
-    plt.hist(df["response_time_days"].dropna(), bins=50)
+    plt.hist(response_time_days.dropna(), bins=50)
     plt.title("Distribution of Time to First Response")
     plt.xlabel("Days")
     plt.ylabel("Number of Issues")
     plt.show()
 
 
-def analyze_issue_patterns():
+@profiled()
+def analyze_issue_patterns(df=None):
     """Analyze when issues are typically created and resolved"""
-    df = pd.read_csv("github_issues.csv")
-    df["created_at"] = pd.to_datetime(df["created_at"])
-    
+    if df is None:
+        df = load_issues(columns=["created_at"])
+
     # Issues by day of week
     plt.figure(figsize=(12, 6))
     df["created_at"].dt.day_name().value_counts().plot(kind='bar')
@@ -215,7 +295,7 @@ def analyze_issue_patterns():
     plt.ylabel("Number of Issues")
     plt.tight_layout()
     plt.show()
-    
+
     # Issues by month
     plt.figure(figsize=(12, 6))
     df["created_at"].dt.month_name().value_counts().plot(kind='bar')
@@ -226,37 +306,72 @@ def analyze_issue_patterns():
     plt.show()
 
 
-def analyze_issue_complexity():
+@profiled()
+def analyze_issue_complexity(df=None):
     """Analyze issue complexity based on body length, comments, and time to close"""
-    df = pd.read_csv("github_issues.csv")
-    
+    if df is None:
+        df = load_issues(
+            columns=["type", "body_length", "comments", "time_to_close_days"]
+        )
+
     plt.figure(figsize=(15, 5))
-    
+
     # Create a subplot with 3 graphs
     plt.subplot(131)
     sns.boxplot(x="type", y="body_length", data=df)
     plt.title("Body Length by Type")
-    
+
     plt.subplot(132)
     sns.boxplot(x="type", y="comments", data=df)
     plt.title("Comments by Type")
-    
+
     plt.subplot(133)
     sns.boxplot(x="type", y="time_to_close_days", data=df)
     plt.title("Time to Close by Type")
-    
+
     plt.tight_layout()
     plt.show()
 
 
-def analyze_user_engagement():
+@profiled()
+def monthly_unique_authors(
+    df=None, path=None, approximate=False, views=False, backend="pandas"
+):
+    """
+    Number of distinct authors per month of ``created_at``, exactly or,
+    with ``approximate``, from a HyperLogLog sketch per month. With ``views``
+    it is read from the materialised views of the CSV instead, and with
+    ``backend="sql"`` counted in DuckDB.
+    """
+    if views:
+        return load_views(path or default_path()).monthly_unique_authors()
+    if backend == "sql":
+        return monthly_result(
+            query_export("monthly_unique_authors", df, path), "authors"
+        )
+    counter = HyperLogLogByGroup if approximate else NuniqueByGroup
+    return aggregate(
+        {
+            "authors": counter(
+                ["created_at", "author"],
+                # Months in UTC; to_period would warn about dropping the tz
+                lambda c: c["created_at"].dt.tz_localize(None).dt.to_period("M"),
+                lambda c: c["author"],
+            )
+        },
+        df,
+        path,
+    )["authors"]
+
+
+@profiled()
+def analyze_user_engagement(
+    df=None, path=None, approximate=False, views=False, backend="pandas"
+):
     """Analyze how user engagement has changed over time"""
-    df = pd.read_csv("github_issues.csv")
-    df["created_at"] = pd.to_datetime(df["created_at"])
-    
     # Group by month and count unique users
-    monthly_users = df.groupby(df["created_at"].dt.to_period("M"))["user"].nunique()
-    
+    monthly_users = monthly_unique_authors(df, path, approximate, views, backend)
+
     plt.figure(figsize=(12, 6))
     monthly_users.plot(kind='line', marker='o')
     plt.title("Unique Users per Month")
@@ -267,44 +382,62 @@ def analyze_user_engagement():
     plt.show()
 
 
-def analyze_contributor_retention():
+@profiled()
+def analyze_contributor_retention(df=None, path=None):
     """
     Analyze how many contributors stay active over time and identify repeat contributors
+    Returns the cohort table: contributors from each first-activity month (rows)
+    still active N months later (columns).
     """
-    df = pd.read_csv("github_issues.csv")
-    df["created_at"] = pd.to_datetime(df["created_at"])
-    
-    # Add month-year field for grouping
-    df["month_year"] = df["created_at"].dt.to_period("M")
-    
-    # Get first contribution date for each user
-    first_contributions = df.groupby("user")["created_at"].min()
-    
-    # Calculate contributor retention by months since first contribution
-    retention_data = []
-    for user, first_date in first_contributions.items():
-        user_activity = df[df["user"] == user]["month_year"].unique()
-        months_active = len(user_activity)
-        retention_data.append(months_active)
-    
+    index = user_index(df, path)
+
+    # One row per (author, active month), months counted from year 0 so the
+    # difference between two of them is a number of months
+    activity = index.activity
+    months_active = index.users["months_active"]
+    cohort = activity["author"].map(index.cohorts())
+
+    cohort_table = (
+        activity.assign(cohort=cohort, months_since=activity["month"] - cohort)
+        .groupby(["cohort", "months_since"])
+        .size()
+        .unstack(fill_value=0)
+    )
+    cohort_table.index = pd.PeriodIndex.from_ordinals(
+        cohort_table.index - 1970 * 12, freq="M"
+    )
+
     plt.figure(figsize=(10, 6))
-    plt.hist(retention_data, bins=20)
+    plt.hist(months_active, bins=20)
     plt.title("Distribution of Contributor Activity Duration")
     plt.xlabel("Number of Months Active")
     plt.ylabel("Number of Contributors")
     plt.show()
 
+    # Share of each cohort still active N months after its first contribution
+    plt.figure(figsize=(14, 8))
+    sns.heatmap(cohort_table.div(cohort_table[0], axis=0), cmap="viridis")
+    plt.title("Contributor Retention by First-Month Cohort")
+    plt.xlabel("Months Since First Contribution")
+    plt.ylabel("Cohort (First Contribution Month)")
+    plt.tight_layout()
+    plt.show()
+
+    return cohort_table
+
 
-def analyze_collaboration_patterns():
+@profiled()
+def analyze_collaboration_patterns(df=None):
     """
     Analyze how users interact with each other through comments and reactions
     """
-    df = pd.read_csv("github_issues.csv")
-    
+    if df is None:
+        df = load_issues(columns=["number", "comments", "reactions"])
+
     # Analyze issues with most community engagement
     engagement_score = df["comments"] + df["reactions"]
-    top_engaged = df.nlargest(10, engagement_score)
-    
+    top_engaged = df.loc[engagement_score.nlargest(10).index]
+
     plt.figure(figsize=(12, 6))
     plt.bar(range(len(top_engaged)), engagement_score[top_engaged.index])
     plt.title("Most Engaging Issues/PRs")
@@ -315,39 +448,50 @@ def analyze_collaboration_patterns():
     plt.show()
 
 
-def analyze_newcomer_experience():
+@profiled()
+def analyze_newcomer_experience(df=None, path=None):
     """
     Analyze the experience of new contributors and their first interactions
     """
-    df = pd.read_csv("github_issues.csv")
-    df["created_at"] = pd.to_datetime(df["created_at"])
-    
-    # For each user, get their first contribution
-    first_contributions = df.sort_values("created_at").groupby("user").first()
-    
-    # Analyze response times for first-time contributors
-    first_contributions["response_time"] = pd.to_datetime(first_contributions["first_response_at"]) - \
-                                         pd.to_datetime(first_contributions["created_at"])
-    first_contributions["response_days"] = first_contributions["response_time"].dt.total_seconds() / (24 * 60 * 60)
-    
+    # Response times to each user's first contribution
+    users = user_index(df, path).users
+    if "first_response_days" not in users:
+        print("Skipped: the export has no time_to_first_response column")
+        return
+    response_days = users["first_response_days"]
+
     plt.figure(figsize=(10, 6))
-    plt.hist(first_contributions["response_days"].dropna(), bins=30)
+    plt.hist(response_days.dropna(), bins=30)
     plt.title("Response Time for First-time Contributors")
     plt.xlabel("Days to First Response")
     plt.ylabel("Number of Contributors")
     plt.show()
 
 
-def analyze_community_growth():
+@profiled()
+def analyze_community_growth(df=None, path=None, approximate=False, views=False):
     """
     Analyze the growth of the community over time
+    Contributors are counted once, from the month of their first contribution;
+    ``approximate`` estimates the running total from a HyperLogLog per month.
     """
-    df = pd.read_csv("github_issues.csv")
-    df["created_at"] = pd.to_datetime(df["created_at"])
-    
-    # Monthly new contributors
-    monthly_new_contributors = df.groupby(df["created_at"].dt.to_period("M"))["user"].nunique().cumsum()
-    
+    if approximate:
+        authors = HyperLogLogByGroup(
+            ["created_at", "author"],
+            lambda c: c["created_at"].dt.tz_localize(None).dt.to_period("M"),
+            lambda c: c["author"],
+        )
+        aggregate({"authors": authors}, df, path)
+        # The union of every month so far counts each contributor once
+        monthly_new_contributors = authors.cumulative()
+    else:
+        # Contributors whose first contribution falls in each month
+        if views:
+            new_contributors = load_views(path or default_path()).monthly_new_authors()
+        else:
+            new_contributors = user_index(df, path).first_months()
+        monthly_new_contributors = new_contributors.cumsum()
+
     plt.figure(figsize=(12, 6))
     monthly_new_contributors.plot(kind='line', marker='o')
     plt.title("Cumulative Growth of Community Members")
@@ -358,19 +502,21 @@ def analyze_community_growth():
     plt.show()
 
 
-def analyze_contribution_diversity():
+@profiled()
+def analyze_contribution_diversity(df=None):
     """
     Analyze the diversity of contribution types and participation patterns
     """
-    df = pd.read_csv("github_issues.csv")
-    
+    if df is None:
+        df = load_issues(columns=["author", "type"])
+
     # Calculate contribution type distribution per user
-    user_contribution_types = df.groupby("user")["type"].value_counts().unstack().fillna(0)
-    
+    user_contribution_types = df.groupby("author")["type"].value_counts().unstack().fillna(0)
+
     # Calculate ratio of PRs to Issues for active users
     user_contribution_types["pr_to_issue_ratio"] = user_contribution_types["pull_request"] / \
                                                   user_contribution_types["issue"].replace(0, 1)
-    
+
     plt.figure(figsize=(12, 6))
     plt.hist(user_contribution_types["pr_to_issue_ratio"], bins=30)
     plt.title("Distribution of PR to Issue Ratio per User")
@@ -378,21 +524,48 @@ def analyze_contribution_diversity():
     plt.ylabel("Number of Users")
     plt.show()
 
-def analyze_resolution_rate():
-    """Analyze the rate at which issues are being resolved over time"""
-    df = pd.read_csv("github_issues.csv")
-    df["created_at"] = pd.to_datetime(df["created_at"])
-    df["closed_at"] = pd.to_datetime(df["closed_at"])
-    
-    # Group by month
-    monthly_created = df.groupby(df["created_at"].dt.to_period("M")).size()
-    monthly_closed = df.groupby(df["closed_at"].dt.to_period("M")).size()
-    
-    # Calculate running ratio
-    cumulative_created = monthly_created.cumsum()
-    cumulative_closed = monthly_closed.cumsum()
-    resolution_rate = (cumulative_closed / cumulative_created) * 100
-    
+@profiled()
+def analyze_resolution_rate(df=None, path=None, views=False, backend="pandas"):
+    """
+    Analyze the rate at which issues are being resolved over time
+    Returns the percentage of the issues created so far that are closed, per
+    month; ``backend="sql"`` computes it in DuckDB.
+    """
+    if backend == "sql":
+        resolution_rate = monthly_result(
+            query_export("resolution_rate", df, path), "resolution_rate"
+        )
+    else:
+        # Group by month
+        if views:
+            materialised = load_views(path or default_path())
+            monthly = {
+                "created_at": materialised.monthly("created_by_month"),
+                "closed_at": materialised.monthly("closed_by_month"),
+            }
+        else:
+            monthly = aggregate(
+                {
+                    col: ValueCounts(
+                        col,
+                        lambda c, col=col: c[col]
+                        .dt.tz_localize(None)
+                        .dt.to_period("M"),
+                    )
+                    for col in ["created_at", "closed_at"]
+                },
+                df,
+                path,
+            )
+        # Months with nothing created or nothing closed count as 0, not NaN
+        monthly = pd.DataFrame(
+            {"created": monthly["created_at"], "closed": monthly["closed_at"]}
+        ).fillna(0)
+
+        # Calculate running ratio
+        cumulative = monthly.sort_index().cumsum()
+        resolution_rate = (cumulative["closed"] / cumulative["created"]) * 100
+
     plt.figure(figsize=(12, 6))
     resolution_rate.plot(kind='line', marker='o')
     plt.title("Issue Resolution Rate Over Time")
@@ -400,102 +573,171 @@ def analyze_resolution_rate():
     plt.ylabel("Resolution Rate (%)")
     plt.grid(True)
     plt.show()
-def analyze_priority_response():
+
+    return resolution_rate
+
+
+@profiled()
+def analyze_priority_response(df=None):
     """Analyze response times based on issue priority/severity"""
-    df = pd.read_csv("github_issues.csv")
-    
-    # You might need to adjust this based on your actual label format
-    df["is_high_priority"] = df["labels"].str.contains("high|critical|priority", case=False)
-    
-    df["created_at"] = pd.to_datetime(df["created_at"])
-    df["first_response_at"] = pd.to_datetime(df["first_response_at"])
-    df["response_time"] = (df["first_response_at"] - df["created_at"]).dt.total_seconds() / (24 * 60 * 60)
-    
+    index = label_index(df)
+    df = optional_columns(df, ["time_to_first_response"])
+    if df is None:
+        return
+
+    # The regex only runs over the distinct label names, not every row
+    priority_labels = index.matching("high|critical|priority")
+    is_high_priority = index.mask(priority_labels)
+
+    response_time = df["time_to_first_response"]
+
+    print("Days to first response by priority label:")
+    print(index.stats(response_time).loc[priority_labels])
+
     plt.figure(figsize=(10, 6))
-    sns.boxplot(x="is_high_priority", y="response_time", data=df)
+    sns.boxplot(x=is_high_priority, y=response_time)
     plt.title("Response Time by Priority")
     plt.xlabel("High Priority")
     plt.ylabel("Days to First Response")
     plt.show()
 
 
-def analyze_label_word_cloud():
-    """Create a word cloud visualization of issue labels"""
-    df = pd.read_csv("github_issues.csv")
-    
-    # Combine all labels into a single string
-    # Assuming labels are stored as strings, we'll join them with spaces
-    all_labels = ' '.join(df['labels'].dropna())
-    
-    # Create and generate a word cloud image
+def show_word_cloud(counts, title, max_words=100):
+    """Draw a word cloud of term counts, without re-tokenising the terms."""
     wordcloud = WordCloud(
-        width=800, 
+        width=800,
         height=400,
         background_color='white',
-        max_words=100
-    ).generate(all_labels)
-    
+        max_words=max_words
+    ).generate_from_frequencies(frequencies(counts, max_words))
+
     # Display the word cloud
     plt.figure(figsize=(10, 5))
     plt.imshow(wordcloud, interpolation='bilinear')
     plt.axis('off')
-    plt.title('Word Cloud of Issue Labels')
+    plt.title(title)
     plt.tight_layout(pad=0)
     plt.show()
 
 
-def analyze_seasonal_patterns():
+@profiled()
+def analyze_label_word_cloud(df=None, path=None, max_words=100):
+    """
+    Create a word cloud visualization of issue labels. Each label is one term,
+    so multi-word labels like "good first issue" stay whole.
+    """
+    if path is None:
+        counts = label_index(df).counts()
+    else:
+        counts = aggregate({"labels": LabelTerms()}, path=path)["labels"]
+    show_word_cloud(counts, "Word Cloud of Issue Labels", max_words)
+    return counts.head(max_words)
+
+
+@profiled()
+def analyze_title_word_cloud(df=None, path=None, max_words=100):
+    """Create a word cloud of the words in issue and PR titles."""
+    counts = aggregate({"titles": TextTerms("title")}, df, path)["titles"]
+    show_word_cloud(counts, "Word Cloud of Issue Titles", max_words)
+    return counts.head(max_words)
+
+
+@profiled()
+def analyze_body_word_cloud(path=None, max_words=100):
+    """
+    Word cloud of the raw bodies kept by a crawl with ``--bodies``. Bodies are
+    streamed from the compressed store and counted BODY_BATCH at a time, so
+    only the word counts are kept.
+    """
+    terms = TextTerms("body")
+    bodies = BodyStore(body_store_path(path or default_path())).iter_bodies()
+    while batch := [body for _, body in itertools.islice(bodies, BODY_BATCH)]:
+        terms.update(pd.DataFrame({"body": batch}))
+
+    counts = terms.result()
+    show_word_cloud(counts, "Word Cloud of Issue Bodies", max_words)
+    return counts.head(max_words)
+
+
+@profiled()
+def analyze_seasonal_patterns(df=None, path=None, views=False):
     """Analyze seasonal patterns in issue creation and resolution"""
-    df = pd.read_csv("github_issues.csv")
-    df["created_at"] = pd.to_datetime(df["created_at"])
-    
+    if views:
+        counts = load_views(path or default_path()).seasonal()
+    else:
+        counts = aggregate(
+            {
+                part: ValueCounts(
+                    "created_at", lambda c, part=part: getattr(c["created_at"].dt, part)
+                )
+                for part in ["hour", "dayofweek", "month"]
+            },
+            df,
+            path,
+        )
+
     # Hour of day analysis
     plt.figure(figsize=(15, 5))
-    
+
     plt.subplot(131)
-    df["created_at"].dt.hour.value_counts().sort_index().plot(kind='bar')
+    counts["hour"].sort_index().plot(kind='bar')
     plt.title("Issues by Hour of Day")
     plt.xlabel("Hour")
-    
+
     plt.subplot(132)
-    df["created_at"].dt.dayofweek.value_counts().sort_index().plot(kind='bar')
+    counts["dayofweek"].sort_index().plot(kind='bar')
     plt.title("Issues by Day of Week")
     plt.xlabel("Day (0=Monday)")
-    
+
     plt.subplot(133)
-    df["created_at"].dt.month.value_counts().sort_index().plot(kind='bar')
+    counts["month"].sort_index().plot(kind='bar')
     plt.title("Issues by Month")
     plt.xlabel("Month")
-    
+
     plt.tight_layout()
     plt.show()
 
 
-def analyze_issue_size_metrics():
+@profiled()
+def analyze_issue_size_metrics(df=None):
     """Analyze relationships between issue size metrics and resolution time"""
-    df = pd.read_csv("github_issues.csv")
-    
+    if df is None:
+        df = load_issues(
+            columns=["body_length", "comments", "time_to_close_days", "reactions"]
+        )
+
     # Calculate correlations between various metrics
     metrics = ["body_length", "comments", "time_to_close_days", "reactions"]
     correlation_matrix = df[metrics].corr()
-    
+
     plt.figure(figsize=(10, 8))
     sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', center=0)
     plt.title("Correlation between Issue Metrics")
     plt.show()
 
 
-def analyze_user_interactions():
-    """Analyze user interaction patterns through comments"""
-    df = pd.read_csv("github_issues.csv")
-    
-    # Assuming you have a comments dataset with author information
-    # This is a simplified version - you'd need actual comment data
-    interactions = df.groupby(['user', 'assignee']).size().reset_index(name='count')
-    
-    # Create a network visualization for top interactions
-    top_interactions = interactions.nlargest(20, 'count')
-    
+@profiled()
+def analyze_user_interactions(df=None, path=None, backend="pandas"):
+    """
+    Analyze user interaction patterns through comments
+    Returns the 20 most frequent (author, assignees) pairs; ``backend="sql"``
+    counts them in DuckDB over the export at ``path``.
+    """
+    if backend == "sql":
+        top_interactions = query_export("user_interactions", df, path, n=20)
+    else:
+        if df is None:
+            df = load_issues(path, columns=["author", "assignees"])
+
+        # Assuming you have a comments dataset with author information
+        # This is a simplified version - you'd need actual comment data
+        interactions = (
+            df.groupby(['author', 'assignees']).size().reset_index(name='count')
+        )
+
+        # Create a network visualization for top interactions
+        top_interactions = interactions.nlargest(20, 'count')
+
     plt.figure(figsize=(12, 8))
     plt.scatter(range(len(top_interactions)), top_interactions['count'])
     plt.title("Top User Interactions")
@@ -504,68 +746,121 @@ def analyze_user_interactions():
     plt.xticks(rotation=45)
     plt.show()
 
+    return top_interactions
+
 
-def analyze_issue_templates():
+@profiled()
+def analyze_issue_templates(df=None):
     """Analyze the effectiveness of issue templates if used"""
-    df = pd.read_csv("github_issues.csv")
-    
-    # Assuming you can detect template usage through body content
-    df["uses_template"] = df["body"].str.contains("### Description|## Expected Behavior", na=False)
-    
+    if df is None:
+        df = load_issues(
+            columns=["uses_template", "time_to_close_days", "comments", "reactions"]
+        )
+
+    # Template sections are detected in the body at crawl time (body_features.py)
+    uses_template = df["uses_template"].fillna(False).astype(bool)
+
     # Compare metrics for template vs non-template issues
     metrics = ["time_to_close_days", "comments", "reactions"]
-    
+
     plt.figure(figsize=(15, 5))
     for i, metric in enumerate(metrics, 1):
         plt.subplot(1, 3, i)
-        sns.boxplot(x="uses_template", y=metric, data=df)
+        sns.boxplot(x=uses_template, y=df[metric])
         plt.title(f"{metric} by Template Usage")
-    
+
     plt.tight_layout()
     plt.show()
 
 
-def analyze_time_to_first_commit():
+@profiled()
+def analyze_time_to_first_commit(df=None):
     """Analyze time between issue creation and first related commit"""
-    df = pd.read_csv("github_issues.csv")
-    
+    df = optional_columns(df, ["time_to_first_commit"])
+    if df is None:
+        return
+
     # Assuming you have first_commit_at data
-    df["created_at"] = pd.to_datetime(df["created_at"])
-    df["first_commit_at"] = pd.to_datetime(df["first_commit_at"])
-    
-    df["time_to_commit"] = (
-        df["first_commit_at"] - df["created_at"]
-    ).dt.total_seconds() / (24 * 60 * 60)
-    
+    time_to_commit = df["time_to_first_commit"]
+
     plt.figure(figsize=(10, 6))
-    plt.hist(df["time_to_commit"].dropna(), bins=50)
+    plt.hist(time_to_commit.dropna(), bins=50)
     plt.title("Time to First Commit Distribution")
     plt.xlabel("Days")
     plt.ylabel("Count")
     plt.show()
 
 
+@profiled()
+def compare_time_to_close(repos=None, since=None, until=None):
+    """
+    Compare how long issues and PRs take to close across repositories of the
+    partitioned store. Only partitions of ``repos`` created between ``since``
+    and ``until`` are read. Returns the median days per repository and type.
+    """
+    df = load_store(repos, since, until, columns=["type", "time_to_close"])
+    repository = df["owner"].astype(str) + "/" + df["repo"].astype(str)
+
+    plt.figure(figsize=(12, 6))
+    sns.boxplot(x=repository, y=df["time_to_close"], hue=df["type"], showfliers=False)
+    plt.title("Time to Close by Repository")
+    plt.xlabel("Repository")
+    plt.ylabel("Days to Close")
+    plt.tight_layout()
+    plt.show()
+
+    medians = df.groupby([repository, "type"], observed=True)["time_to_close"].median()
+    return medians.unstack()
+
+
 if __name__ == "__main__":
-    # # analysis()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--profile",
+        metavar="TRACE",
+        help="record per-stage timings into this Chrome trace (.jsonl: JSON lines)",
+    )
+    args = parser.parse_args()
+    if args.profile:
+        enable()
+        show = plt.show
+
+        def draw_and_show(*show_args, **show_kwargs):
+            # Render under a span first, so plotting is timed apart from the
+            # time the window stays open
+            with span("plot"):
+                for number in plt.get_fignums():
+                    plt.figure(number).canvas.draw()
+            show(*show_args, **show_kwargs)
+
+        plt.show = draw_and_show
+
+    # Parse the export once and share the frame between every analysis
+    df = load_issues()
+
+    # # analysis(df)
     # # In your analysis() function, you could add:
     # print("\nAverage Time to Close PRs (days):")
-    # print(average_time_take_to_close_pr())
+    # print(average_time_take_to_close_pr(df))
 
     # print("\nAverage Time to Close Issues (days):")
-    # print(average_time_take_to_close_issue())
-    # number_of_days_for_each_issue()
+    # print(average_time_take_to_close_issue(df))
+    # number_of_days_for_each_issue(df)
 
     # print("\nTop Issue Creators:")
-    # print(most_active_issue_creators())
-    
+    # print(most_active_issue_creators(df=df))
+
     print("\nTop PR Authors:")
-    most_active_pr_authors()
-
-    analyze_label_word_cloud()
-    analyze_resolution_rate()
-    analyze_priority_response()
-    analyze_seasonal_patterns()
-    analyze_issue_size_metrics()
-    analyze_user_interactions()
-    analyze_issue_templates()
-    analyze_time_to_first_commit()
\ No newline at end of file
+    most_active_pr_authors(df=df)
+
+    analyze_label_word_cloud(df)
+    analyze_resolution_rate(df)
+    analyze_priority_response(df)
+    analyze_seasonal_patterns(df)
+    analyze_issue_size_metrics(df)
+    analyze_user_interactions(df)
+    analyze_issue_templates(df)
+    analyze_time_to_first_commit(df)
+
+    if args.profile:
+        write_trace(args.profile)
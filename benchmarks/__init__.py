@@ -0,0 +1 @@
+"""Benchmarks over synthetic issue exports; run with ``python -m benchmarks.run``."""
@@ -0,0 +1,109 @@
+"""
+The row-at-a-time transforms the crawlers used before ``transform.py``: one
+list per item, built with ``.get()`` chains and two ``strptime`` calls.
+They are kept only as baselines for the transform benchmarks and produce
+the same rows as ``rest_page_to_frame`` and ``graphql_page_to_frame``.
+"""
+
+from datetime import datetime
+
+from body_features import item_features
+
+
+def get_reactions(data):
+    # The reactions object also holds "url" and per-emoji counts
+    return data.get("reactions", {}).get("total_count", 0)
+
+
+def rest_row(issue):
+    if "pull_request" in issue:
+        _type = "pull_request"
+        if issue.get("pr_merged", False):
+            pr_status = "merged"
+        elif issue["state"] == "closed":
+            pr_status = "rejected"
+        else:
+            pr_status = "open"
+    else:
+        _type = "issue"
+        pr_status = None
+
+    labels = [label["name"] for label in issue.get("labels", [])]
+    assignees = [assignee["login"] for assignee in issue.get("assignees", [])]
+
+    # Calculate time to close if applicable
+    created_at = issue.get("created_at")
+    closed_at = issue.get("closed_at")
+    time_to_close = None
+    if created_at and closed_at:
+        created_dt = datetime.strptime(created_at, "%Y-%m-%dT%H:%M:%SZ")
+        closed_dt = datetime.strptime(closed_at, "%Y-%m-%dT%H:%M:%SZ")
+        time_to_close = (closed_dt - created_dt).days
+
+    return [
+        issue.get("id"),
+        issue.get("number"),
+        issue.get("title", "").replace("\n", " ").replace(",", " "),
+        issue.get("state"),
+        pr_status,
+        created_at,
+        closed_at,
+        issue.get("updated_at"),
+        issue.get("comments"),
+        ",".join(labels),
+        _type,
+        issue.get("user", {}).get("login"),
+        ",".join(assignees),
+        issue.get("milestone", {}).get("title") if issue.get("milestone") else None,
+        len(issue.get("body", "")) if issue.get("body") else 0,
+        get_reactions(issue) if issue.get("reactions") else 0,
+        time_to_close,
+        len(issue.get("pull_request", {}).get("links", []))
+        if "pull_request" in issue
+        else 0,
+        issue.get("locked", False),
+        issue.get("comments", 0),  # Using comments as a proxy for participants
+        issue.get("html_url"),
+        *item_features(issue.get("body")),
+    ]
+
+
+def graphql_row(item, item_type):
+    labels = [label["name"] for label in item.get("labels", {}).get("nodes", [])]
+    assignees = [
+        assignee["login"] for assignee in item.get("assignees", {}).get("nodes", [])
+    ]
+
+    # Calculate time to close if applicable
+    created_at = item.get("createdAt")
+    closed_at = item.get("closedAt")
+    time_to_close = None
+    if created_at and closed_at:
+        created_dt = datetime.strptime(created_at, "%Y-%m-%dT%H:%M:%SZ")
+        closed_dt = datetime.strptime(closed_at, "%Y-%m-%dT%H:%M:%SZ")
+        time_to_close = (closed_dt - created_dt).days
+
+    return [
+        item.get("id"),
+        item.get("number"),
+        item.get("title", "").replace("\n", " ").replace(",", " "),
+        item.get("state"),
+        "merged" if item.get("merged") else None if item_type == "issue" else "open",
+        created_at,
+        closed_at,
+        item.get("updatedAt"),
+        item.get("comments", {}).get("totalCount", 0),
+        ",".join(labels),
+        item_type,
+        item.get("author", {}).get("login") if item.get("author") else None,
+        ",".join(assignees),
+        item.get("milestone", {}).get("title") if item.get("milestone") else None,
+        len(item.get("body", "")) if item.get("body") else 0,
+        item.get("reactions", {}).get("totalCount", 0),
+        time_to_close,
+        0,  # linked PRs (would need additional query)
+        item.get("locked", False),
+        item.get("comments", {}).get("totalCount", 0),
+        item.get("url"),
+        *item_features(item.get("body")),
+    ]
@@ -0,0 +1,317 @@
+"""
+Benchmarks for loading, row transformation and the analyses, over synthetic
+exports of 10k to 10M rows:
+
+    uv run python -m benchmarks.run --sizes 10k 100k
+    uv run python -m benchmarks.run --compare benchmarks/results/before.json
+
+Every benchmark runs in a fresh process, so one run's caches and allocations
+don't leak into the next and its peak RSS is that benchmark's peak memory.
+Analyses run under the Agg backend with ``plt.show`` closing the figures,
+so figures are built but never rendered. Results are written as JSON; with
+``--compare`` each timing and peak is checked against an earlier run and the
+exit status is 1 if any regressed by more than ``--threshold``.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from benchmarks.synthetic import (
+    generate_frame,
+    graphql_nodes,
+    rest_items,
+    write_dataset,
+)
+from profiling import peak_rss_mb
+
+DATA_DIR = os.path.join("benchmarks", "data")
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+SIZES = ["10k", "100k", "1M", "10M"]
+
+# Building millions of API items as dicts is itself slow and large, so the
+# transformation benchmarks stop here; their result is a rate anyway
+TRANSFORM_ROWS = 200_000
+
+THRESHOLD = 0.2
+
+_setup_mb = None
+
+
+def parse_size(size):
+    """Turn "10k" or "1M" into a row count."""
+    units = {"k": 1_000, "M": 1_000_000}
+    if size[-1] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(size)
+
+
+def _time(func, repeat):
+    """Run ``func`` ``repeat`` times and return the fastest run in seconds."""
+    global _setup_mb
+    # Imports and inputs are in place; everything above this is the benchmark
+    _setup_mb = peak_rss_mb()
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_load_csv(path, repeat):
+    from loader import read_issues_csv
+
+    return _time(lambda: read_issues_csv(path), repeat)
+
+
+def bench_load_first(path, repeat):
+    from loader import clear_cache, load_issues, sidecar_path
+
+    def first_load():
+        # Parse the CSV and write the sidecar, as the first analysis run does
+        if os.path.exists(sidecar_path(path)):
+            os.remove(sidecar_path(path))
+        clear_cache()
+        load_issues(path)
+
+    return _time(first_load, repeat)
+
+
+def bench_load_sidecar(path, repeat):
+    from loader import clear_cache, load_issues
+
+    def load():
+        clear_cache()
+        load_issues(path)
+
+    # load.first_load has written the sidecar
+    return _time(load, repeat)
+
+
+def bench_rest_rows(rows, repeat):
+    from benchmarks.baselines import rest_row
+
+    items = rest_items(generate_frame(rows, flavor="rest"))
+    return _time(lambda: [rest_row(item) for item in items], repeat)
+
+
+def bench_rest_frame(rows, repeat):
+    from transform import batched, rest_page_to_frame
+
+    items = rest_items(generate_frame(rows, flavor="rest"))
+    return _time(
+        lambda: [rest_page_to_frame(page) for page in batched([items])], repeat
+    )
+
+
+def bench_graphql_rows(rows, repeat):
+    from benchmarks.baselines import graphql_row
+
+    nodes = graphql_nodes(generate_frame(rows))
+    return _time(lambda: [graphql_row(node, t) for t, node in nodes], repeat)
+
+
+def bench_graphql_frame(rows, repeat):
+    from transform import BATCH_SIZE, graphql_page_to_frame
+
+    nodes = graphql_nodes(generate_frame(rows))
+    by_type = {}
+    for item_type, node in nodes:
+        by_type.setdefault(item_type, []).append(node)
+
+    def transform():
+        for item_type, typed in by_type.items():
+            for i in range(0, len(typed), BATCH_SIZE):
+                graphql_page_to_frame(typed[i : i + BATCH_SIZE], item_type)
+
+    return _time(transform, repeat)
+
+
+def bench_analysis(path, repeat, name):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    import analysis
+    from loader import load_issues
+
+    # Build the figures but never render them
+    plt.show = lambda *args, **kwargs: plt.close("all")
+    df = load_issues(path)
+    func = getattr(analysis, name)
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            return _time(lambda: func(df=df), repeat)
+        finally:
+            sys.stdout = stdout
+
+
+BENCHMARKS = {
+    "load.read_issues_csv": (bench_load_csv, "path"),
+    "load.first_load": (bench_load_first, "path"),
+    "load.sidecar": (bench_load_sidecar, "path"),
+    "transform.baseline.rest_row": (bench_rest_rows, "rows"),
+    "transform.rest_page_to_frame": (bench_rest_frame, "rows"),
+    "transform.baseline.graphql_row": (bench_graphql_rows, "rows"),
+    "transform.graphql_page_to_frame": (bench_graphql_frame, "rows"),
+}
+
+
+def run_benchmark(name, func, arg, repeat, *extra):
+    """Run one benchmark in this (fresh) process and describe the outcome."""
+    seconds = error = None
+    try:
+        seconds = func(arg, repeat, *extra)
+    except Exception:
+        error = traceback.format_exc(limit=3)
+    return {
+        "seconds": seconds,
+        "peak_mb": round(peak_rss_mb(), 1),
+        "setup_mb": None if _setup_mb is None else round(_setup_mb, 1),
+        "error": error,
+    }
+
+
+def run(sizes, analyses, repeat=1, data_dir=DATA_DIR, transform_rows=TRANSFORM_ROWS):
+    """Run every benchmark at every size and return the list of results."""
+    results = []
+    # One task per process: peaks and caches start from zero every time
+    pool = ProcessPoolExecutor(
+        1, mp_context=get_context("spawn"), max_tasks_per_child=1
+    )
+    with pool:
+        for size in sizes:
+            rows = parse_size(size)
+            path = write_dataset(os.path.join(data_dir, f"issues_{size}.csv"), rows)
+            tasks = []
+            for name, (func, kind) in BENCHMARKS.items():
+                n = min(rows, transform_rows) if kind == "rows" else rows
+                tasks.append((name, n, func, path if kind == "path" else n))
+            for name in analyses:
+                tasks.append((f"analysis.{name}", rows, bench_analysis, path, name))
+
+            for name, n, func, arg, *extra in tasks:
+                outcome = pool.submit(run_benchmark, name, func, arg, repeat, *extra)
+                result = {"name": name, "size": size, "rows": n, **outcome.result()}
+                results.append(result)
+                _print_result(result)
+    return results
+
+
+def _print_result(result):
+    if result["error"]:
+        status = "failed: " + result["error"].strip().splitlines()[-1]
+    else:
+        rate = result["rows"] / result["seconds"] if result["seconds"] else 0
+        status = f"{result['seconds']:9.3f}s {rate:13,.0f} rows/s"
+    print(
+        f"{result['size']:>5} {result['name']:<45} {status} "
+        f"{result['peak_mb']:9.1f} MB peak, {result['setup_mb'] or 0:.0f} MB before",
+        flush=True,
+    )
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(results, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    document = {
+        "commit": _git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    return path
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Return the regressions of ``results`` against the results of an earlier
+    run: every (name, size) that got slower or used more memory by more than
+    ``threshold``, or that passed before and fails now.
+    """
+    before = {(r["name"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = before.get((result["name"], result["size"]))
+        if old is None or old["error"]:
+            continue
+        if result["error"]:
+            regressions.append((result["name"], result["size"], "error", None, None))
+            continue
+        for metric in ("seconds", "peak_mb"):
+            if result[metric] > old[metric] * (1 + threshold):
+                regressions.append(
+                    (
+                        result["name"],
+                        result["size"],
+                        metric,
+                        old[metric],
+                        result[metric],
+                    )
+                )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", nargs="+", default=SIZES, help="e.g. 10k 1M")
+    parser.add_argument("--analyses", nargs="*", help="analyses to time (default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="keep the fastest run")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--transform-rows", type=int, default=TRANSFORM_ROWS)
+    parser.add_argument("--output", help="results JSON (default: timestamped)")
+    parser.add_argument("--compare", help="results JSON of an earlier run")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    if args.analyses is None:
+        # Imported here so the benchmark processes don't load matplotlib
+        from report import DEFAULT_ANALYSES
+
+        args.analyses = DEFAULT_ANALYSES
+    results = run(
+        args.sizes, args.analyses, args.repeat, args.data_dir, args.transform_rows
+    )
+    output = args.output or os.path.join(
+        RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    print(f"Results written to {write_results(results, output)}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for name, size, metric, old, new in regressions:
+            if metric == "error":
+                print(f"REGRESSION {size} {name}: now fails")
+            else:
+                print(f"REGRESSION {size} {name}: {metric} {old:.3f} -> {new:.3f}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
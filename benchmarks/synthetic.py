@@ -0,0 +1,261 @@
+"""
+Synthetic GitHub issue/PR datasets in the COLUMNS schema that eda.py and
+github_graphql.py write, plus raw REST items and GraphQL nodes to feed their
+row transformations.
+
+Everything is generated with numpy a million rows at a time, so a 10M-row
+file takes a few minutes and little memory. Distributions are rough but
+shaped like a real repository: a heavy-tailed author population, lognormal
+times to close and body lengths, and a handful of common labels.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from body_features import TEMPLATE_SECTIONS
+from issue_writer import COLUMNS
+
+GENERATE_CHUNK_ROWS = 1_000_000
+
+START = pd.Timestamp("2015-01-01", tz="UTC")
+END = pd.Timestamp("2025-01-01", tz="UTC")
+
+WORDS = np.array(
+    "add fix crash error support docs update parser async memory leak test build "
+    "regression slow windows linux macos unicode import typing deprecate remove "
+    "warning segfault compiler lint release refactor cache thread".split()
+)
+LABELS = np.array(
+    [
+        "bug",
+        "enhancement",
+        "documentation",
+        "question",
+        "good first issue",
+        "help wanted",
+        "priority: high",
+        "priority: critical",
+        "type-bug",
+        "type-feature",
+        "needs-triage",
+        "wontfix",
+        "duplicate",
+        "performance",
+        "tests",
+        "build",
+        "3.12",
+        "3.13",
+        "A-diagnostics",
+        "T-compiler",
+    ]
+)
+MILESTONES = np.array(["v1.0", "v1.1", "v2.0", "3.13.0", "backlog"])
+
+# Body text behind each feature, so rebuilt items have the frame's features
+BODY_PARTS = {
+    "has_description": "### Description\n\n",
+    "has_expected_behavior": "### Expected behavior\n\n",
+    "has_reproduction": "### Steps to reproduce\n\n",
+    "has_environment": "### Environment\n\n",
+    "has_code_block": "```\ncode\n```\n",
+    "has_stack_trace": "Traceback (most recent call last):\n",
+}
+LINK_TEXT = "https://example.com "
+
+
+def _join_choices(rng, pool, counts):
+    """Join ``counts[i]`` random items of ``pool`` with commas for each row."""
+    size = int(counts.max()) if len(counts) else 0
+    picks = pool[rng.integers(0, len(pool), (len(counts), max(size, 1)))]
+    joined = np.full(len(counts), "", dtype=object)
+    for k in range(size):
+        has = counts > k
+        sep = np.where(k > 0, ",", "")
+        joined[has] = joined[has] + sep + picks[has, k]
+    return pd.Series(joined).replace("", None).to_numpy()
+
+
+def generate_frame(rows, seed=0, flavor="graphql", offset=0):
+    """
+    Return ``rows`` synthetic items as a frame in COLUMNS order, with values
+    formatted as the crawlers write them. ``flavor`` picks REST ("rest",
+    integer ids, lowercase states) or GraphQL conventions ("graphql").
+    """
+    rng = np.random.default_rng((seed, offset))
+    number = np.arange(offset + 1, offset + rows + 1)
+    is_pr = rng.random(rows) < 0.45
+    closed = rng.random(rows) < 0.75
+    merged = is_pr & closed & (rng.random(rows) < 0.7)
+
+    span = (END - START).total_seconds()
+    created = START + pd.to_timedelta(np.sort(rng.random(rows)) * span, unit="s")
+    created = created.floor("s")
+    to_close = pd.to_timedelta(rng.lognormal(3.5, 1.8, rows), unit="h").floor("s")
+    closed_at = pd.Series(created + to_close).where(closed)
+    updated = closed_at.fillna(pd.Series(created) + pd.Timedelta(hours=1))
+
+    authors = np.char.add(
+        "user", (rng.zipf(1.4, rows) % max(rows // 10, 100)).astype(str)
+    )
+    assignee_pool = np.char.add("user", np.arange(1, 201).astype(str))
+    comments = rng.negative_binomial(1, 0.15, rows)
+
+    uses_template = rng.random(rows) < 0.4
+    features = {
+        col: uses_template & (rng.random(rows) < 0.8)
+        for col in BODY_PARTS
+        if col in TEMPLATE_SECTIONS
+    }
+    features["uses_template"] = np.logical_or.reduce(list(features.values()))
+    features["has_code_block"] = rng.random(rows) < 0.3
+    features["has_stack_trace"] = rng.random(rows) < 0.1
+    features["link_count"] = rng.poisson(0.7, rows)
+    # At least as long as the text of its features
+    feature_text = sum(features[col] * len(part) for col, part in BODY_PARTS.items())
+    feature_text += features["link_count"] * len(LINK_TEXT)
+    body_length = np.maximum(rng.lognormal(6, 1.2, rows).astype(int), feature_text)
+    fmt = "%Y-%m-%dT%H:%M:%SZ"
+
+    if flavor == "rest":
+        ids = 10_000_000 + number
+        states = np.where(closed, "closed", "open")
+        pr_status = np.select(
+            [~is_pr, merged, closed], [None, "merged", "rejected"], "open"
+        )
+    else:
+        ids = np.char.add(np.where(is_pr, "PR_kwDO", "I_kwDO"), number.astype(str))
+        states = np.where(merged, "MERGED", np.where(closed, "CLOSED", "OPEN"))
+        pr_status = np.where(merged, "merged", np.where(is_pr, "open", None))
+
+    frame = pd.DataFrame(
+        {
+            "id": ids,
+            "number": number,
+            "title": pd.Series(WORDS[rng.integers(0, len(WORDS), (rows, 5))].tolist())
+            .str.join(" ")
+            .to_numpy(),
+            "state": states,
+            "pr_status": pr_status,
+            "created_at": created.strftime(fmt),
+            "closed_at": closed_at.dt.strftime(fmt),
+            "updated_at": updated.dt.strftime(fmt),
+            "comments": comments,
+            "labels": _join_choices(rng, LABELS, rng.binomial(3, 0.35, rows)),
+            "type": np.where(is_pr, "pull_request", "issue"),
+            "author": authors,
+            "assignees": _join_choices(rng, assignee_pool, rng.binomial(2, 0.2, rows)),
+            "milestone": np.where(
+                rng.random(rows) < 0.1, MILESTONES[rng.integers(0, 5, rows)], None
+            ),
+            "body_length": body_length,
+            "reactions": rng.poisson(0.8, rows),
+            "time_to_close_days": pd.Series(to_close.days)
+            .where(closed)
+            .astype("Int64"),
+            "linked_prs": 0,
+            "is_locked": rng.random(rows) < 0.01,
+            "participants_count": comments,
+            "url": np.char.add(
+                np.where(
+                    is_pr,
+                    "https://github.com/o/r/pull/",
+                    "https://github.com/o/r/issues/",
+                ),
+                number.astype(str),
+            ),
+            **features,
+        }
+    )
+    return frame[COLUMNS]
+
+
+def write_dataset(path, rows, seed=0, flavor="graphql"):
+    """Write a ``rows``-row synthetic CSV to ``path`` unless it already exists."""
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    for offset in range(0, rows, GENERATE_CHUNK_ROWS):
+        chunk = generate_frame(
+            min(GENERATE_CHUNK_ROWS, rows - offset), seed, flavor, offset
+        )
+        chunk.to_csv(tmp, mode="a" if offset else "w", header=not offset, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+def _body(row):
+    text = "".join(part for col, part in BODY_PARTS.items() if getattr(row, col))
+    text += LINK_TEXT * row.link_count
+    return text + "x" * (row.body_length - len(text))
+
+
+def rest_items(frame):
+    """Turn a REST-flavoured frame back into issue items as the REST API sends them."""
+    items = []
+    for row in frame.itertuples(index=False):
+        item = {
+            "id": row.id,
+            "number": row.number,
+            "title": row.title,
+            "state": row.state,
+            "created_at": row.created_at,
+            "closed_at": row.closed_at if isinstance(row.closed_at, str) else None,
+            "updated_at": row.updated_at,
+            "comments": row.comments,
+            "labels": [{"name": n} for n in row.labels.split(",")]
+            if row.labels
+            else [],
+            "user": {"login": row.author},
+            "assignees": [{"login": a} for a in row.assignees.split(",")]
+            if row.assignees
+            else [],
+            "milestone": {"title": row.milestone} if row.milestone else None,
+            "body": _body(row),
+            "reactions": {
+                "url": row.url,
+                "total_count": row.reactions,
+                "+1": row.reactions,
+            },
+            "locked": row.is_locked,
+            "html_url": row.url,
+        }
+        if row.type == "pull_request":
+            item["pull_request"] = {"url": row.url}
+            item["pr_merged"] = row.pr_status == "merged"
+        items.append(item)
+    return items
+
+
+def graphql_nodes(frame):
+    """Turn a GraphQL-flavoured frame back into (item_type, node) pairs."""
+    nodes = []
+    for row in frame.itertuples(index=False):
+        node = {
+            "id": row.id,
+            "number": row.number,
+            "title": row.title,
+            "state": row.state,
+            "createdAt": row.created_at,
+            "closedAt": row.closed_at if isinstance(row.closed_at, str) else None,
+            "updatedAt": row.updated_at,
+            "comments": {"totalCount": row.comments},
+            "labels": {"nodes": [{"name": n} for n in row.labels.split(",")]}
+            if row.labels
+            else {"nodes": []},
+            "author": {"login": row.author},
+            "assignees": {"nodes": [{"login": a} for a in row.assignees.split(",")]}
+            if row.assignees
+            else {"nodes": []},
+            "milestone": {"title": row.milestone} if row.milestone else None,
+            "body": _body(row),
+            "reactions": {"totalCount": row.reactions},
+            "locked": row.is_locked,
+            "url": row.url,
+        }
+        if row.type == "pull_request":
+            node["merged"] = row.pr_status == "merged"
+        nodes.append((row.type, node))
+    return nodes
@@ -0,0 +1,187 @@
+"""
+Features of issue and PR bodies, computed once at crawl time.
+
+Neither crawler keeps the bodies themselves: as each page streams through
+the transform, its bodies are reduced to the FEATURE_COLUMNS written next to
+``body_length`` (template sections, code blocks, stack traces, links) and to
+a hashed bag-of-words vector per item. The vectors are appended to
+``<csv>.bodies/`` as one compressed ``.npz`` part per page, so the crawl's
+memory stays flat; ``load_vectors`` stacks them into one sparse matrix.
+
+Parts are numbered in the order they were written and the latest part wins:
+an item written again, by an incremental run or by a crawl refetching pages
+after an interruption, is read from its newest vector. That is also how a
+part written for rows the CSV never got is reconciled. The watermark and the
+checkpoint only advance once the rows are on disk, so the next run fetches
+those items again and supersedes it.
+"""
+
+import functools
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import scipy.sparse as sp
+
+# Section headings of the common GitHub issue templates (cpython, rust, the
+# GitHub defaults), matched case-insensitively at the start of a line
+TEMPLATE_SECTIONS = {
+    "has_description": r"^#{1,4} *(?:description|bug description|summary)\b",
+    "has_expected_behavior": r"^#{1,4} *expected (?:behaviou?r|result|outcome)",
+    "has_reproduction": r"^#{1,4} *(?:steps to reproduce|to reproduce|reproduc)",
+    "has_environment": r"^#{1,4} *(?:environment|your environment|versions?|meta)\b",
+}
+
+CODE_BLOCK = r"^ *(?:```|~~~)"
+# Python tracebacks, Rust panics, Java/JS frames and backtraces
+STACK_TRACE = (
+    r"Traceback \(most recent call last\)|panicked at|^stack backtrace:"
+    r"|^\s+at \S+ \(\S+:\d+(?::\d+)?\)$|^\s+File \"[^\"]+\", line \d+"
+)
+LINK = r"https?://"
+
+FEATURE_COLUMNS = [
+    *TEMPLATE_SECTIONS,
+    "uses_template",
+    "has_code_block",
+    "has_stack_trace",
+    "link_count",
+]
+
+# Nullable, since items crawled before these columns existed have none
+FEATURE_DTYPES = {col: "boolean" for col in FEATURE_COLUMNS} | {"link_count": "Int32"}
+
+# Columns of the hashed bag-of-words; collisions are rare at this width
+N_FEATURES = 2**18
+
+_flags = re.IGNORECASE | re.MULTILINE
+_sections = {name: re.compile(p, _flags) for name, p in TEMPLATE_SECTIONS.items()}
+_code_block = re.compile(CODE_BLOCK, re.MULTILINE)
+_stack_trace = re.compile(STACK_TRACE, re.MULTILINE)
+_link = re.compile(LINK)
+
+
+@functools.cache
+def vectorizer():
+    # Imported on first use: every module that knows COLUMNS imports this one
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    return HashingVectorizer(
+        n_features=N_FEATURES, alternate_sign=False, norm=None, dtype=np.float32
+    )
+
+
+def _matches(bodies, pattern, flags="m"):
+    # Arrow's RE2 kernels scan the whole column without a Python call per body
+    return pc.match_substring_regex(bodies, f"(?{flags}){pattern}").to_numpy(
+        zero_copy_only=False
+    )
+
+
+def body_features(bodies):
+    """Return the FEATURE_COLUMNS of a Series of bodies (None for no body)."""
+    bodies = pd.Series(bodies, dtype=object).fillna("")
+    bodies = pa.array(bodies, type=pa.string())
+    features = pd.DataFrame(
+        {
+            name: _matches(bodies, pattern, "im")
+            for name, pattern in TEMPLATE_SECTIONS.items()
+        }
+    )
+    features["uses_template"] = features.any(axis=1)
+    features["has_code_block"] = _matches(bodies, CODE_BLOCK)
+    features["has_stack_trace"] = _matches(bodies, STACK_TRACE)
+    features["link_count"] = pc.count_substring_regex(bodies, LINK).to_numpy(
+        zero_copy_only=False
+    )
+    return features.astype(FEATURE_DTYPES)
+
+
+def item_features(body):
+    """FEATURE_COLUMNS of one body as a list, for the row-at-a-time crawlers."""
+    body = body or ""
+    sections = [bool(pattern.search(body)) for pattern in _sections.values()]
+    return [
+        *sections,
+        any(sections),
+        bool(_code_block.search(body)),
+        bool(_stack_trace.search(body)),
+        len(_link.findall(body)),
+    ]
+
+
+def vectors_dir(path):
+    return f"{path}.bodies"
+
+
+def _parts(directory):
+    """(number, name) of the ``part-<number>.npz`` files in ``directory``, in order."""
+    parts = []
+    for name in os.listdir(directory):
+        match = re.fullmatch(r"part-(\d+)\.npz", name)
+        if match:
+            parts.append((int(match.group(1)), name))
+    return sorted(parts)
+
+
+def clear_vectors(path):
+    """Drop the vectors of ``path``, before a full crawl rewrites it."""
+    shutil.rmtree(vectors_dir(path), ignore_errors=True)
+
+
+def write_vectors(path, ids, bodies):
+    """Append the hashed bag-of-words of one page of bodies to ``path``'s vectors."""
+    directory = vectors_dir(path)
+    os.makedirs(directory, exist_ok=True)
+    matrix = vectorizer().transform(pd.Series(bodies, dtype=object).fillna(""))
+    # One past the newest part, so no part is overwritten even if some are gone
+    parts = _parts(directory)
+    number = parts[-1][0] + 1 if parts else 0
+    part = os.path.join(directory, f"part-{number:06d}.npz")
+    tmp = f"{part}.tmp.npz"
+    np.savez_compressed(
+        tmp,
+        ids=np.asarray([str(i) for i in ids]),
+        data=matrix.data,
+        indices=matrix.indices,
+        indptr=matrix.indptr,
+    )
+    os.replace(tmp, part)
+    return part
+
+
+def load_vectors(path):
+    """
+    Return ``(ids, matrix)``: the ids of the items of ``path`` as an Index and
+    their bag-of-words counts as a CSR matrix with N_FEATURES columns. An item
+    fetched again by an incremental run keeps its latest vector.
+    """
+    directory = vectors_dir(path)
+    ids, matrices = [], []
+    for _, name in _parts(directory):
+        with np.load(os.path.join(directory, name)) as part:
+            ids.append(part["ids"])
+            shape = (len(part["ids"]), N_FEATURES)
+            matrices.append(
+                sp.csr_matrix((part["data"], part["indices"], part["indptr"]), shape)
+            )
+    if not matrices:
+        return pd.Index([], dtype=object), sp.csr_matrix((0, N_FEATURES))
+
+    ids = pd.Index(np.concatenate(ids))
+    matrix = sp.vstack(matrices, format="csr")
+    latest = ~ids.duplicated(keep="last")
+    return ids[latest], matrix[latest]
+
+
+def vectorized_pages(pages, path):
+    """Write the vectors of each page of raw API items as it passes through."""
+    for items in pages:
+        write_vectors(
+            path, [i.get("id") for i in items], [i.get("body") for i in items]
+        )
+        yield items
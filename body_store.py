@@ -0,0 +1,214 @@
+"""
+Compressed, memory-mapped store of raw issue and PR bodies.
+
+Bodies are only kept when a crawler runs with ``--bodies``; everything else
+works from the features of body_features.py. The store is a directory next
+to the CSV (``<csv>.bodystore/``):
+
+    data.zst     zstd frames, each compressing a block of up to BLOCK_BYTES of
+                 bodies laid end to end
+    blocks.bin   (offset, size) of each frame in data.zst
+    index.bin    (block, start, length) of each body within its block
+    ids.txt      the id of each body, one per line, in index order
+
+The files are appended to page by page and the binary ones are memory-mapped
+for reading: looking a body up decompresses one block, iterating decompresses
+each block once, and only one block's bodies are ever Python strings.
+An item stored again (an incremental run, a resumed crawl) is read from its
+latest copy. zstandard is optional (``uv add zstandard``).
+"""
+
+import os
+import shutil
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Uncompressed bytes per zstd frame: bigger compresses better, smaller makes
+# random lookups cheaper
+BLOCK_BYTES = 256 * 1024
+
+COMPRESSION_LEVEL = 6
+
+BLOCK_DTYPE = np.dtype([("offset", "<i8"), ("size", "<i8")])
+INDEX_DTYPE = np.dtype([("block", "<i4"), ("start", "<i4"), ("length", "<i4")])
+
+
+def body_store_path(path):
+    return f"{path}.bodystore"
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise ImportError("The body store needs zstandard: uv add zstandard")
+
+
+def _records(path, dtype):
+    """Number of whole ``dtype`` records in the file at ``path``."""
+    return os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+
+
+def _memmap(path, dtype):
+    count = _records(path, dtype)
+    # np.memmap refuses empty files
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+class BodyStore:
+    """Append-only store of bodies by id; see the module docstring for the layout."""
+
+    def __init__(self, directory):
+        _require_zstandard()
+        self.directory = directory
+        self._compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._open()
+
+    def _file(self, name):
+        return os.path.join(self.directory, name)
+
+    def _open(self):
+        blocks = _memmap(self._file("blocks.bin"), BLOCK_DTYPE)
+        index = _memmap(self._file("index.bin"), INDEX_DTYPE)
+        lines = []
+        if os.path.exists(self._file("ids.txt")):
+            with open(self._file("ids.txt"), "rb") as f:
+                # An id without its newline is from an interrupted append
+                lines = f.read().split(b"\n")[:-1]
+        # A page interrupted mid-append is ignored past its last complete
+        # record: ids are written last, and only the blocks they use are kept
+        self.index = index[: len(lines)]
+        lines = lines[: len(self.index)]
+        self.ids = [line.decode("utf-8") for line in lines]
+        used = int(self.index["block"].max()) + 1 if len(self.index) else 0
+        self.blocks = blocks[:used]
+        self._ids_bytes = sum(len(line) + 1 for line in lines)
+        self._rows = {id_: row for row, id_ in enumerate(self.ids)}
+        self._data = None
+        self._cached = (None, None)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, id_):
+        return str(id_) in self._rows
+
+    def append(self, ids, bodies):
+        """Append one page of bodies (None for an item without one)."""
+        ids = [str(i) for i in ids]
+        if not ids:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._truncate_partial_page()
+        encoded = [(body or "").encode("utf-8") for body in bodies]
+
+        index = np.zeros(len(encoded), dtype=INDEX_DTYPE)
+        frames, block, start = [], [], 0
+        for i, data in enumerate(encoded):
+            if block and start + len(data) > BLOCK_BYTES:
+                frames.append(b"".join(block))
+                block, start = [], 0
+            index[i] = (len(self.blocks) + len(frames), start, len(data))
+            block.append(data)
+            start += len(data)
+        frames.append(b"".join(block))
+
+        blocks = np.zeros(len(frames), dtype=BLOCK_DTYPE)
+        data_path = self._file("data.zst")
+        offset = os.path.getsize(data_path) if os.path.exists(data_path) else 0
+        with open(data_path, "ab") as f:
+            for i, frame in enumerate(frames):
+                compressed = self._compressor.compress(frame)
+                f.write(compressed)
+                blocks[i] = (offset, len(compressed))
+                offset += len(compressed)
+        # Data first and ids last, so a reader never sees a body without data
+        with open(self._file("blocks.bin"), "ab") as f:
+            f.write(blocks.tobytes())
+        with open(self._file("index.bin"), "ab") as f:
+            f.write(index.tobytes())
+        lines = "".join(f"{id_}\n" for id_ in ids).encode("utf-8")
+        with open(self._file("ids.txt"), "ab") as f:
+            f.write(lines)
+        self._ids_bytes += len(lines)
+
+        # Only the new ids are added; ids.txt is not read again
+        first = len(self.ids)
+        self.ids.extend(ids)
+        self._rows.update((id_, row) for row, id_ in enumerate(ids, first))
+        self.blocks = _memmap(self._file("blocks.bin"), BLOCK_DTYPE)
+        self.index = _memmap(self._file("index.bin"), INDEX_DTYPE)[: len(self.ids)]
+        # data.zst grew, so it is mapped again on the next read
+        self._data = None
+
+    def _truncate_partial_page(self):
+        # Drop what an interrupted append left past the last complete record,
+        # so the next page's ids, index rows and blocks line up again
+        data_end = 0
+        if len(self.blocks):
+            offset, size = self.blocks[-1]
+            data_end = int(offset + size)
+        for name, keep in (
+            ("data.zst", data_end),
+            ("blocks.bin", len(self.blocks) * BLOCK_DTYPE.itemsize),
+            ("index.bin", len(self.ids) * INDEX_DTYPE.itemsize),
+            ("ids.txt", self._ids_bytes),
+        ):
+            path = self._file(name)
+            if os.path.exists(path) and os.path.getsize(path) > keep:
+                os.truncate(path, keep)
+
+    def _block(self, number):
+        if self._cached[0] != number:
+            if self._data is None:
+                self._data = np.memmap(self._file("data.zst"), dtype=np.uint8, mode="r")
+            offset, size = self.blocks[number]
+            frame = self._data[offset : offset + size]
+            self._cached = (number, self._decompressor.decompress(frame))
+        return self._cached[1]
+
+    def _body(self, row):
+        number, start, length = self.index[row]
+        return self._block(number)[start : start + length].decode("utf-8")
+
+    def get(self, id_, default=None):
+        """Return the body of ``id_``, or ``default`` if it is not stored."""
+        row = self._rows.get(str(id_))
+        return default if row is None else self._body(row)
+
+    def __getitem__(self, id_):
+        body = self.get(id_)
+        if body is None:
+            raise KeyError(id_)
+        return body
+
+    def iter_bodies(self, ids=None):
+        """
+        Yield ``(id, body)`` for ``ids`` (default: every stored item), in
+        storage order so that each block is decompressed once.
+        """
+        if ids is None:
+            rows = sorted(self._rows.values())
+        else:
+            rows = sorted(self._rows[str(i)] for i in ids if str(i) in self._rows)
+        for row in rows:
+            yield self.ids[row], self._body(row)
+
+
+def clear_bodies(path):
+    """Drop the stored bodies of ``path``, before a full crawl rewrites it."""
+    shutil.rmtree(body_store_path(path), ignore_errors=True)
+
+
+def stored_pages(pages, path):
+    """Append the bodies of each page of raw API items as it passes through."""
+    store = BodyStore(body_store_path(path))
+    for items in pages:
+        store.append([i.get("id") for i in items], [i.get("body") for i in items])
+        yield items
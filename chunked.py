@@ -0,0 +1,185 @@
+"""
+Mergeable aggregates for exports too big to load in one DataFrame.
+
+An aggregate keeps a small partial result (a count, a sum, a value_counts
+Series, a sample of rows) that is updated one chunk at a time
+and can be merged with the partial result of another chunk, file or process.
+``aggregate`` feeds them either one in-memory frame or the chunks of
+``loader.iter_issues``, so an analysis gives the same answer whichever way
+its data arrives, with memory bounded by the chunk size.
+"""
+
+import numpy as np
+import pandas as pd
+
+from loader import CHUNK_ROWS, iter_issues, load_issues
+
+# Rows kept by Sample, e.g. for a scatter plot of a multi-GB export
+SAMPLE_ROWS = 100_000
+
+
+class Aggregate:
+    """
+    Base class. ``columns`` are the columns the aggregate reads, ``key`` maps a
+    chunk to the values to aggregate (by default its first column).
+    """
+
+    def __init__(self, columns, key=None):
+        self.columns = [columns] if isinstance(columns, str) else list(columns)
+        self.key = key or (lambda chunk: chunk[self.columns[0]])
+
+    def values(self, chunk):
+        values = self.key(chunk)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Chunks have their own categories; count the plain values
+            values = values.astype(values.cat.categories.dtype)
+        return values
+
+    def update(self, chunk):
+        raise NotImplementedError
+
+    def merge(self, other):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+
+class Mean(Aggregate):
+    """Mean of the non-null values, kept as a float64 sum and a count."""
+
+    def __init__(self, columns, key=None):
+        super().__init__(columns, key)
+        self.sum = 0.0
+        self.count = 0
+
+    def update(self, chunk):
+        values = self.values(chunk).dropna()
+        self.sum += values.to_numpy(dtype="float64").sum()
+        self.count += len(values)
+
+    def merge(self, other):
+        self.sum += other.sum
+        self.count += other.count
+
+    def result(self):
+        return self.sum / self.count if self.count else np.nan
+
+
+class ValueCounts(Aggregate):
+    """
+    Occurrences of each non-null value, most common first (ties by value).
+    Per-month or per-day group sizes are value counts of a derived key.
+    """
+
+    def __init__(self, columns, key=None):
+        super().__init__(columns, key)
+        self.counts = None
+
+    def update(self, chunk):
+        counts = self.values(chunk).value_counts()
+        self.merge_counts(counts)
+
+    def merge(self, other):
+        if other.counts is not None:
+            self.merge_counts(other.counts)
+
+    def merge_counts(self, counts):
+        if self.counts is None:
+            self.counts = counts
+        else:
+            self.counts = self.counts.add(counts, fill_value=0)
+
+    def result(self):
+        if self.counts is None:
+            return pd.Series(dtype="int64", name="count")
+        counts = self.counts.astype("int64").rename("count").sort_index()
+        return counts.sort_values(ascending=False, kind="stable")
+
+
+class NuniqueByGroup(Aggregate):
+    """
+    Number of distinct non-null values per group, like
+    ``groupby(group)[column].nunique()``. ``group`` maps a chunk to the group
+    of each row. Keeps the distinct (group, value) pairs, so memory grows
+    with those rather than with rows; sketches.HyperLogLogByGroup is the
+    constant-memory version.
+    """
+
+    def __init__(self, columns, group, key=None):
+        super().__init__(columns, key)
+        self.group = group
+        self.pairs = None
+
+    def update(self, chunk):
+        pairs = pd.DataFrame({"group": self.group(chunk), "value": self.values(chunk)})
+        self.merge_pairs(pairs.dropna().drop_duplicates())
+
+    def merge(self, other):
+        if other.pairs is not None:
+            self.merge_pairs(other.pairs)
+
+    def merge_pairs(self, pairs):
+        if self.pairs is not None:
+            pairs = pd.concat([self.pairs, pairs]).drop_duplicates()
+        self.pairs = pairs
+
+    def result(self):
+        if self.pairs is None:
+            return pd.Series(dtype="int64")
+        return self.pairs.groupby("group")["value"].size().rename_axis(None)
+
+
+class Sample(Aggregate):
+    """
+    Uniform random sample of at most ``size`` rows: every row gets a random
+    priority and the ``size`` smallest are kept. With fewer rows than
+    ``size`` the sample is the whole data.
+    """
+
+    def __init__(self, columns, size=SAMPLE_ROWS, seed=0):
+        super().__init__(columns)
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.rows = None
+
+    def update(self, chunk):
+        rows = chunk[self.columns].assign(_priority=self.rng.random(len(chunk)))
+        self.merge_rows(rows)
+
+    def merge(self, other):
+        if other.rows is not None:
+            self.merge_rows(other.rows)
+
+    def merge_rows(self, rows):
+        if self.rows is not None:
+            rows = pd.concat([self.rows, rows])
+        if len(rows) > self.size:
+            rows = rows.nsmallest(self.size, "_priority")
+        self.rows = rows
+
+    def result(self):
+        if self.rows is None:
+            return pd.DataFrame(columns=self.columns)
+        return self.rows.drop(columns="_priority")
+
+
+def aggregate(aggregates, df=None, path=None, chunk_rows=CHUNK_ROWS):
+    """
+    Update a dict of aggregates over one source and return their results
+    under the same keys. The source is the export at ``path`` read in chunks
+    of ``chunk_rows`` rows, else ``df`` as a single chunk, else the columns
+    the aggregates need from ``load_issues``.
+    """
+    columns = list(dict.fromkeys(c for agg in aggregates.values() for c in agg.columns))
+    if path is not None:
+        chunks = iter_issues(path, columns, chunk_rows)
+    elif df is not None:
+        chunks = [df]
+    else:
+        chunks = [load_issues(columns=columns)]
+
+    for chunk in chunks:
+        for agg in aggregates.values():
+            agg.update(chunk)
+    return {name: agg.result() for name, agg in aggregates.items()}
@@ -1,146 +1,202 @@
-import requests
-import csv
+import argparse
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from aggregates import build_views, load_views
+from body_features import clear_vectors, vectorized_pages
+from body_store import clear_bodies, stored_pages
+from http_cache import CACHE_DIR, ResponseCache
+from issue_writer import write_pages
+from profiling import count, enable, span, write_trace
+from rate_limit import RateLimiter
+from store import STORE_DIR, store_pages
+from sync import read_watermark, scan_watermark, upsert_pages, write_watermark
+from transform import batched, rest_page_to_frame
 
 load_dotenv()
 
 TOKEN = os.getenv("gh_token")
 OWNER = "python"
 REPO = "cpython"
+API_URL = "https://api.github.com"
 
 LIMIT = 1000
 
-
-def fetch_issues(owner, repo, state="all", per_page=500):
-    issues_data = []
-    url = f"https://api.github.com/repos/{owner}/{repo}/issues"
+# Number of PR detail requests in flight at once
+PR_WORKERS = 8
+
+# Paces the page and PR detail requests of every worker
+rate_limiter = RateLimiter()
+
+# Attempts per request when GitHub answers with a rate limit error
+RATE_LIMIT_RETRIES = 3
+
+
+def make_session(pool_size=PR_WORKERS):
+    """Create a keep-alive session whose pool can serve every PR worker."""
+    session = requests.Session()
+    session.headers["Authorization"] = f"token {TOKEN}"
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def rate_limited_get(session, url, params=None, cache=None):
+    """
+    GET ``url`` through the shared rate limiter, retrying rate limited
+    responses. With a ``cache``, the request is answered or revalidated by it.
+    """
+
+    def send(headers):
+        for attempt in range(RATE_LIMIT_RETRIES):
+            if attempt:
+                count("retries")
+            with span("rate_limit_wait"):
+                rate_limiter.wait()
+            with span("http", url=url):
+                response = session.get(url, params=params, headers=headers)
+            count("requests")
+            count("bytes", len(response.content))
+            if not rate_limiter.update_from_headers(
+                response.status_code, response.headers, response.text
+            ):
+                break
+        return response
+
+    if cache is None:
+        return send({})
+    return cache.get(url, params, send)
+
+
+def fetch_pr_details(session, item, cache=None):
+    pr_response = rate_limited_get(session, item["pull_request"]["url"], cache=cache)
+    if pr_response.status_code == 200:
+        with span("json_decode"):
+            pr_data = pr_response.json()
+        item["pr_merged"] = pr_data.get("merged", False)
+        item["pr_merged_at"] = pr_data.get("merged_at")
+
+
+def fetch_issues(
+    owner,
+    repo,
+    state="all",
+    per_page=500,
+    max_workers=PR_WORKERS,
+    since=None,
+    cache=None,
+):
+    """
+    Yield the issues of ``owner/repo`` one page at a time.
+    With ``since``, only items updated at or after that timestamp are fetched.
+    With a ``cache`` (http_cache.ResponseCache), requests go through it.
+    """
+    url = f"{API_URL}/repos/{owner}/{repo}/issues"
     params = {"state": state, "per_page": per_page, "page": 1}
-    headers = {"Authorization": f"token {TOKEN}"}
+    if since:
+        params.update(since=since, sort="updated", direction="asc")
+    session = make_session(max_workers)
     counter = 0
-    while counter <= LIMIT:
-        print(f"the counter is {counter}")
-        response = requests.get(url, headers=headers, params=params)
-        if response.status_code != 200:
-            print("Error:", response.json())
-            break
-
-        issues_page = response.json()
-        if not issues_page:
-            break
-        for item in issues_page:
-            if "pull_request" in item:
-                pr_url = item["pull_request"]["url"]
-                pr_response = requests.get(pr_url, headers=headers)
-                if pr_response.status_code == 200:
-                    pr_data = pr_response.json()
-                    item["pr_merged"] = pr_data.get("merged", False)
-                    item["pr_merged_at"] = pr_data.get("merged_at")
-
-        issues_data.extend(issues_page)
-        params["page"] += 1
-        counter += 500
-    return issues_data
-
-
-def get_reactions(data):
-    try:
-        return sum(int(i) for i in data.get("reactions", {}).values())
-    except ValueError:
-        for i in data.get("reactions", {}).values():
-            print(i, "\n")
-    return 0
-
-
-def main():
-    issues = fetch_issues(OWNER, REPO)
-    with open("github_issues.csv", "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(
-            [
-                "id",
-                "number",
-                "title",
-                "state",
-                "pr_status",
-                "created_at",
-                "closed_at",
-                "updated_at",
-                "comments",
-                "labels",
-                "type",
-                "author",
-                "assignees",
-                "milestone",
-                "body_length",
-                "reactions",
-                "time_to_close_days",
-                "linked_prs",
-                "is_locked",
-                "participants_count",
-                "url",
-            ]
-        )
-
-        for issue in issues:
-            if "pull_request" in issue:
-                _type = "pull_request"
-                if issue.get("pr_merged", False):
-                    pr_status = "merged"
-                elif issue["state"] == "closed":
-                    pr_status = "rejected"
-                else:
-                    pr_status = "open"
-            else:
-                _type = "issue"
-                pr_status = None
-
-            labels = [label["name"] for label in issue.get("labels", [])]
-            assignees = [assignee["login"] for assignee in issue.get("assignees", [])]
-
-            # Calculate time to close if applicable
-            created_at = issue.get("created_at")
-            closed_at = issue.get("closed_at")
-            time_to_close = None
-            if created_at and closed_at:
-                from datetime import datetime
-
-                created_dt = datetime.strptime(created_at, "%Y-%m-%dT%H:%M:%SZ")
-                closed_dt = datetime.strptime(closed_at, "%Y-%m-%dT%H:%M:%SZ")
-                time_to_close = (closed_dt - created_dt).days
-
-            writer.writerow(
-                [
-                    issue.get("id"),
-                    issue.get("number"),
-                    issue.get("title", "").replace("\n", " ").replace(",", " "),
-                    issue.get("state"),
-                    pr_status,
-                    created_at,
-                    closed_at,
-                    issue.get("updated_at"),
-                    issue.get("comments"),
-                    ",".join(labels),
-                    _type,
-                    issue.get("user", {}).get("login"),
-                    ",".join(assignees),
-                    issue.get("milestone", {}).get("title")
-                    if issue.get("milestone")
-                    else None,
-                    len(issue.get("body", "")) if issue.get("body") else 0,
-                    get_reactions(issue) if issue.get("reactions") else 0,
-                    time_to_close,
-                    len(issue.get("pull_request", {}).get("links", []))
-                    if "pull_request" in issue
-                    else 0,
-                    issue.get("locked", False),
-                    issue.get(
-                        "comments", 0
-                    ),  # Using comments as a proxy for participants
-                    issue.get("html_url"),
-                ]
-            )
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while counter <= LIMIT:
+            print(f"the counter is {counter}")
+            response = rate_limited_get(session, url, params=params, cache=cache)
+            if response.status_code != 200:
+                print("Error:", response.json())
+                break
+
+            with span("json_decode"):
+                issues_page = response.json()
+            if not issues_page:
+                break
+
+            # Look up merge status for every PR on the page concurrently
+            pull_requests = [item for item in issues_page if "pull_request" in item]
+            with span("pr_details", pull_requests=len(pull_requests)):
+                list(
+                    pool.map(
+                        lambda item: fetch_pr_details(session, item, cache),
+                        pull_requests,
+                    )
+                )
+
+            yield issues_page
+            params["page"] += 1
+            counter += 500
+
+    if cache is not None:
+        # Reported with the other counters under --profile
+        count("cache_hits", cache.hits)
+        count("cache_misses", cache.misses)
+
+
+def main(incremental=False, cache=None, store=False, bodies=False):
+    path = "github_issues.csv"
+    since = read_watermark(path) if incremental else None
+    pages = fetch_issues(OWNER, REPO, since=since, cache=cache)
+    if not since:
+        clear_vectors(path)
+        clear_bodies(path)
+    # Bodies are reduced to vectors here and to feature columns in the transform
+    pages = vectorized_pages(pages, path)
+    if bodies:
+        pages = stored_pages(pages, path)
+    rows = (rest_page_to_frame(batch) for batch in batched(pages))
+    if store:
+        rows = store_pages(rows, OWNER, REPO)
+
+    if since:
+        print(f"Fetching items updated since {since}")
+        upsert_pages(path, rows, views=load_views(path))
+    else:
+        write_pages(path, rows)
+        write_watermark(path, scan_watermark(path))
+        build_views(path)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only fetch items updated since the last run and merge them in",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help=f"cache responses in {CACHE_DIR} and revalidate them with ETags",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="replay cached responses only, without touching the network",
+    )
+    parser.add_argument(
+        "--store",
+        action="store_true",
+        help=f"also write the items into the partitioned store in {STORE_DIR}",
+    )
+    parser.add_argument(
+        "--bodies",
+        action="store_true",
+        help="also keep the raw bodies in a compressed store (needs zstandard)",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="TRACE",
+        help="record per-stage timings into this Chrome trace (.jsonl: JSON lines)",
+    )
+    args = parser.parse_args()
+    cache = None
+    if args.cache or args.offline:
+        cache = ResponseCache(offline=args.offline)
+    if args.profile:
+        enable()
+    main(args.incremental, cache, args.store, args.bodies)
+    if args.profile:
+        write_trace(args.profile)
@@ -1,26 +1,41 @@
+import argparse
+import json
 import os
-from dotenv import load_dotenv
-import csv
-from datetime import datetime
+import queue
+import threading
 import time
-from gql import gql, Client
+
+from dotenv import load_dotenv
+from gql import Client, gql
+from gql.transport.exceptions import TransportQueryError, TransportServerError
 from gql.transport.requests import RequestsHTTPTransport
 
+from aggregates import build_views, load_views
+from body_features import clear_vectors, write_vectors
+from body_store import BodyStore, body_store_path, clear_bodies
+from issue_writer import write_pages
+from profiling import count, enable, span, write_trace
+from rate_limit import GRAPHQL_POINTS_PER_MINUTE, RateLimiter
+from store import STORE_DIR, store_pages
+from sync import read_watermark, scan_watermark, upsert_pages, write_watermark
+from transform import BATCH_SIZE, graphql_page_to_frame
+
 load_dotenv()
 TOKEN = os.getenv("gh_token")
 OWNER = "rust-lang"
 REPO = "rust"
 
-# GraphQL query for fetching issues and PRs
-QUERY = """
-query($owner: String!, $repo: String!, $cursor: String) {
-  repository(owner: $owner, name: $repo) {
-    issues(first: 100, after: $cursor, orderBy: {field: CREATED_AT, direction: DESC}) {
-      pageInfo {
-        hasNextPage
-        endCursor
-      }
-      nodes {
+GRAPHQL_URL = "https://api.github.com/graphql"
+
+# Failed requests are retried with exponential backoff: 2s, 4s, 8s, ...
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 2
+
+# Shared by both streams so together they stay within the budget
+rate_limiter = RateLimiter(GRAPHQL_POINTS_PER_MINUTE)
+
+# Fields shared by issue and pull request nodes
+NODE_FIELDS = """
         id
         number
         title
@@ -53,163 +68,287 @@ query($owner: String!, $repo: String!, $cursor: String) {
         }
         locked
         url
-      }
-    }
-    pullRequests(first: 100, after: $cursor, orderBy: {field: CREATED_AT, direction: DESC}) {
+"""
+
+CONNECTION_QUERY = """
+query($owner: String!, $repo: String!, $cursor: String%(variables)s) {
+  rateLimit {
+    cost
+    remaining
+    resetAt
+  }
+  repository(owner: $owner, name: $repo) {
+    %(connection)s(first: 100, after: $cursor, %(arguments)s) {
       pageInfo {
         hasNextPage
         endCursor
       }
-      nodes {
-        id
-        number
-        title
-        state
-        createdAt
-        closedAt
-        updatedAt
-        merged
-        mergedAt
-        comments {
-          totalCount
-        }
-        labels(first: 100) {
-          nodes {
-            name
-          }
-        }
-        author {
-          login
-        }
-        assignees(first: 10) {
-          nodes {
-            login
-          }
-        }
-        milestone {
-          title
-        }
-        body
-        reactions {
-          totalCount
-        }
-        locked
-        url
-      }
+      nodes {%(fields)s      }
     }
   }
 }
 """
 
+PR_FIELDS = NODE_FIELDS + "        merged\n        mergedAt\n"
+
+FULL_ORDER = "orderBy: {field: CREATED_AT, direction: DESC}"
+UPDATED_ORDER = "orderBy: {field: UPDATED_AT, direction: DESC}"
+
+def build_query(connection, fields, arguments, variables=""):
+    return CONNECTION_QUERY % {
+        "connection": connection,
+        "fields": fields,
+        "arguments": arguments,
+        "variables": variables,
+    }
+
+# Issues and pull requests are paged as independent streams, each with its
+# own cursor, so a finished stream never costs bytes or rate limit again.
+ISSUES_QUERY = build_query("issues", NODE_FIELDS, FULL_ORDER)
+PULL_REQUESTS_QUERY = build_query("pullRequests", PR_FIELDS, FULL_ORDER)
+
+# Incremental queries walk the most recently updated items first. Issues can
+# be filtered server side; pullRequests has no filterBy, so that stream stops
+# at the first node older than the watermark.
+ISSUES_SINCE_QUERY = build_query(
+    "issues",
+    NODE_FIELDS,
+    UPDATED_ORDER + ", filterBy: {since: $since}",
+    variables=", $since: DateTime",
+)
+PULL_REQUESTS_SINCE_QUERY = build_query("pullRequests", PR_FIELDS, UPDATED_ORDER)
+
+STREAMS = {
+    "issue": ("issues", ISSUES_QUERY, ISSUES_SINCE_QUERY),
+    "pull_request": ("pullRequests", PULL_REQUESTS_QUERY, PULL_REQUESTS_SINCE_QUERY),
+}
+
 def setup_client():
     transport = RequestsHTTPTransport(
-        url='https://api.github.com/graphql',
+        url=GRAPHQL_URL,
         headers={'Authorization': f'Bearer {TOKEN}'}
     )
     return Client(transport=transport, fetch_schema_from_transport=True)
 
-def fetch_data():
+def fetch_connection(item_type, since=None, cursor=None):
+    """
+    Yield (nodes, page_info) pages of one connection ("issue" or
+    "pull_request") until it runs out, starting after ``cursor``.
+    With ``since``, only nodes updated at or after that timestamp are yielded.
+    """
+    connection, query, since_query = STREAMS[item_type]
+    # gql clients cannot be shared between threads, so each stream gets its own
     client = setup_client()
-    all_issues = []
-    all_prs = []
-    
-    issues_cursor = None
-    prs_cursor = None
-    has_next_issues = True
-    has_next_prs = True
-    
-    while has_next_issues or has_next_prs:
+    document = gql(since_query if since else query)
+    variables = {"owner": OWNER, "repo": REPO, "cursor": cursor}
+    filtered = since and "$since" in since_query
+    if filtered:
+        variables["since"] = since
+    fetched = 0
+    attempt = 0
+
+    has_next = True
+
+    while has_next:
+        with span("rate_limit_wait"):
+            rate_limiter.wait()
+        try:
+            # gql decodes the JSON inside execute, so the span covers both
+            with span("http", connection=connection):
+                result = client.execute(document, variable_values=variables)
+            count("requests")
+            length = (client.transport.response_headers or {}).get("Content-Length")
+            if length is not None:
+                count("bytes", int(length))
+            data = result["repository"][connection]
+        except Exception as e:
+            count("requests")
+            attempt += 1
+            if attempt > MAX_RETRIES:
+                raise
+            count("retries")
+            headers = client.transport.response_headers
+            if (
+                isinstance(e, TransportServerError)
+                and rate_limiter.update_from_headers(e.code, headers)
+            ) or (
+                isinstance(e, TransportQueryError)
+                and rate_limiter.update_from_graphql_errors(e.errors, headers)
+            ):
+                # The limiter holds the next request for as long as needed
+                print(f"Rate limited, retry {attempt}/{MAX_RETRIES}")
+                continue
+            delay = BACKOFF_SECONDS * 2 ** (attempt - 1)
+            print(f"Error occurred: {e}, retry {attempt}/{MAX_RETRIES} in {delay}s")
+            time.sleep(delay)
+            continue
+        attempt = 0
+        rate_limiter.update_from_graphql(result["rateLimit"])
+
+        nodes = data["nodes"]
+        page_info = data["pageInfo"]
+        if since and not filtered:
+            # ISO 8601 UTC timestamps sort the same as strings
+            nodes = [n for n in nodes if n["updatedAt"] >= since]
+            if len(nodes) < len(data["nodes"]):
+                page_info = dict(page_info, hasNextPage=False)
+        has_next = page_info["hasNextPage"]
+        variables["cursor"] = page_info["endCursor"]
+        fetched += len(nodes)
+        print(f"Fetched {fetched} {connection}")
+
+        yield nodes, page_info
+
+def fetch_data(since=None, checkpoint=None):
+    """
+    Yield (item_type, nodes, page_info) pages from the issue and pull request
+    streams, which are paged concurrently, in the order they arrive.
+    Streams in ``checkpoint`` resume from their saved cursor or are skipped
+    once done.
+    """
+    streams = {item_type: None for item_type in STREAMS}
+    if checkpoint is not None:
+        streams = {
+            item_type: state["cursor"]
+            for item_type, state in checkpoint["streams"].items()
+            if not state["done"]
+        }
+
+    # Bounded so the fetchers cannot run far ahead of the CSV writer
+    pages = queue.Queue(maxsize=2 * len(STREAMS))
+
+    def pump(item_type, cursor):
         try:
-            result = client.execute(
-                gql(QUERY),
-                variable_values={
-                    "owner": OWNER,
-                    "repo": REPO,
-                    "cursor": issues_cursor if has_next_issues else prs_cursor
-                }
-            )
-            
-            repo_data = result["repository"]
-            
-            if has_next_issues:
-                issues_data = repo_data["issues"]
-                all_issues.extend(issues_data["nodes"])
-                has_next_issues = issues_data["pageInfo"]["hasNextPage"]
-                issues_cursor = issues_data["pageInfo"]["endCursor"]
-                print(f"Fetched {len(all_issues)} issues")
-            
-            if has_next_prs:
-                prs_data = repo_data["pullRequests"]
-                all_prs.extend(prs_data["nodes"])
-                has_next_prs = prs_data["pageInfo"]["hasNextPage"]
-                prs_cursor = prs_data["pageInfo"]["endCursor"]
-                print(f"Fetched {len(all_prs)} pull requests")
-            
-            time.sleep(0.5)  # Be nice to GitHub's API
-            
+            for nodes, page_info in fetch_connection(item_type, since, cursor):
+                pages.put((item_type, nodes, page_info))
+            pages.put((item_type, None, None))
         except Exception as e:
-            print(f"Error occurred: {e}")
-            time.sleep(60)  # Wait if we hit rate limits
-    
-    return all_issues, all_prs
-
-def process_item(item, item_type):
-    labels = [label["name"] for label in item.get("labels", {}).get("nodes", [])]
-    assignees = [assignee["login"] for assignee in item.get("assignees", {}).get("nodes", [])]
-    
-    # Calculate time to close if applicable
-    created_at = item.get("createdAt")
-    closed_at = item.get("closedAt")
-    time_to_close = None
-    if created_at and closed_at:
-        created_dt = datetime.strptime(created_at, "%Y-%m-%dT%H:%M:%SZ")
-        closed_dt = datetime.strptime(closed_at, "%Y-%m-%dT%H:%M:%SZ")
-        time_to_close = (closed_dt - created_dt).days
-
-    return [
-        item.get("id"),
-        item.get("number"),
-        item.get("title", "").replace("\n", " ").replace(",", " "),
-        item.get("state"),
-        "merged" if item.get("merged") else None if item_type == "issue" else "open",
-        created_at,
-        closed_at,
-        item.get("updatedAt"),
-        item.get("comments", {}).get("totalCount", 0),
-        ",".join(labels),
-        item_type,
-        item.get("author", {}).get("login") if item.get("author") else None,
-        ",".join(assignees),
-        item.get("milestone", {}).get("title") if item.get("milestone") else None,
-        len(item.get("body", "")) if item.get("body") else 0,
-        item.get("reactions", {}).get("totalCount", 0),
-        time_to_close,
-        0,  # linked PRs (would need additional query)
-        item.get("locked", False),
-        item.get("comments", {}).get("totalCount", 0),
-        item.get("url"),
-    ]
-
-def main():
-    issues, prs = fetch_data()
-    
-    with open(f"github_{REPO}_issues.csv", "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "id", "number", "title", "state", "pr_status",
-            "created_at", "closed_at", "updated_at", "comments",
-            "labels", "type", "author", "assignees", "milestone",
-            "body_length", "reactions", "time_to_close_days",
-            "linked_prs", "is_locked", "participants_count", "url"
-        ])
-        
-        # Write issues
-        for issue in issues:
-            writer.writerow(process_item(issue, "issue"))
-            
-        # Write PRs
-        for pr in prs:
-            writer.writerow(process_item(pr, "pull_request"))
+            pages.put((item_type, e, None))
+
+    for item_type, cursor in streams.items():
+        threading.Thread(target=pump, args=(item_type, cursor), daemon=True).start()
+
+    running = len(streams)
+    while running:
+        item_type, nodes, page_info = pages.get()
+        if nodes is None:
+            running -= 1
+        elif isinstance(nodes, Exception):
+            raise nodes
+        else:
+            yield item_type, nodes, page_info
+
+def checkpoint_path(path):
+    return f"{path}.checkpoint.json"
+
+def load_checkpoint(path):
+    """Return the progress saved by an interrupted full crawl into ``path``."""
+    if not (os.path.exists(checkpoint_path(path)) and os.path.exists(path)):
+        return None
+    with open(checkpoint_path(path), encoding="utf-8") as f:
+        return json.load(f)
+
+def save_checkpoint(path, checkpoint):
+    tmp = f"{checkpoint_path(path)}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, checkpoint_path(path))
+
+def transformed_pages(since=None, path=None, checkpoint=None, bodies=None):
+    """
+    Yield frames of CSV rows, transforming each stream in batches of
+    BATCH_SIZE nodes, and write the body vectors of each batch for ``path``
+    once the batch has been taken. With a ``checkpoint``, it is saved for
+    ``path`` after that. With a ``bodies`` BodyStore, the raw bodies are
+    appended to it along with the vectors.
+    """
+    batches = {item_type: [] for item_type in STREAMS}
+    for item_type, nodes, page_info in fetch_data(since, checkpoint):
+        batches[item_type].extend(nodes)
+        if len(batches[item_type]) < BATCH_SIZE and page_info["hasNextPage"]:
+            continue
+        batch = batches[item_type]
+        yield graphql_page_to_frame(batch, item_type)
+        batches[item_type] = []
+
+        # Only reached once the batch's rows have been written out, so
+        # the vectors never get ahead of the rows, and the checkpoint never
+        # gets ahead of either
+        ids = [node.get("id") for node in batch]
+        texts = [node.get("body") for node in batch]
+        if path is not None:
+            write_vectors(path, ids, texts)
+        if bodies is not None:
+            bodies.append(ids, texts)
+        if checkpoint is not None:
+            checkpoint["streams"][item_type] = {
+                "cursor": page_info["endCursor"],
+                "done": not page_info["hasNextPage"],
+            }
+            checkpoint["offset"] = os.path.getsize(path)
+            save_checkpoint(path, checkpoint)
+
+def main(incremental=False, store=False, bodies=False):
+    path = f"github_{REPO}_issues.csv"
+    since = read_watermark(path) if incremental else None
+
+    if since:
+        print(f"Fetching items updated since {since}")
+        body_store = BodyStore(body_store_path(path)) if bodies else None
+        rows = transformed_pages(since, path, bodies=body_store)
+        rows = store_pages(rows, OWNER, REPO) if store else rows
+        upsert_pages(path, rows, views=load_views(path))
+        return
+
+    checkpoint = load_checkpoint(path)
+    if checkpoint is not None:
+        print(f"Resuming crawl into {path} from its checkpoint")
+        # Drop anything written after the last checkpointed page
+        with open(path, "r+b") as f:
+            f.truncate(checkpoint["offset"])
+    else:
+        clear_vectors(path)
+        clear_bodies(path)
+        checkpoint = {
+            "offset": 0,
+            "streams": {t: {"cursor": None, "done": False} for t in STREAMS},
+        }
+
+    body_store = BodyStore(body_store_path(path)) if bodies else None
+    rows = transformed_pages(path=path, checkpoint=checkpoint, bodies=body_store)
+    if store:
+        # Upserts by id, so pages fetched again after a resume are harmless
+        rows = store_pages(rows, OWNER, REPO)
+    write_pages(path, rows, append=checkpoint["offset"] > 0)
+    os.remove(checkpoint_path(path))
+    write_watermark(path, scan_watermark(path))
+    build_views(path)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only fetch items updated since the last run and merge them in",
+    )
+    parser.add_argument(
+        "--store",
+        action="store_true",
+        help=f"also write the items into the partitioned store in {STORE_DIR}",
+    )
+    parser.add_argument(
+        "--bodies",
+        action="store_true",
+        help="also keep the raw bodies in a compressed store (needs zstandard)",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="TRACE",
+        help="record per-stage timings into this Chrome trace (.jsonl: JSON lines)",
+    )
+    args = parser.parse_args()
+    if args.profile:
+        enable()
+    main(args.incremental, args.store, args.bodies)
+    if args.profile:
+        write_trace(args.profile)
\ No newline at end of file
@@ -0,0 +1,149 @@
+"""
+On-disk response cache for the REST crawler (eda.py).
+
+Responses are stored by URL and query parameters together with their
+ETag/Last-Modified validators, and later requests for the same URL are sent
+as conditional requests. GitHub does not charge rate limit for a
+``304 Not Modified``, so unchanged pages and PR details are served from disk.
+
+The cache is bounded in size, evicting the least recently used entries,
+and can replay a previous crawl without any network access (``offline``).
+"""
+
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+CACHE_DIR = ".http_cache"
+MAX_BYTES = 512 * 1024 * 1024
+
+# Response headers worth keeping with a cached body
+KEPT_HEADERS = ["Content-Type", "ETag", "Last-Modified", "Link"]
+
+
+class ResponseCache:
+    """
+    Conditional-request cache; ``get`` takes a ``send(headers)`` callable
+    that performs the actual request.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES, offline=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(
+            entry.stat().st_size for entry in os.scandir(directory) if entry.is_file()
+        )
+
+    def key(self, url, params=None):
+        query = urlencode(sorted((params or {}).items()))
+        return hashlib.sha256(f"{url}?{query}".encode()).hexdigest()
+
+    def get(self, url, params, send):
+        """Return the response for ``url``, revalidating a cached copy if any."""
+        key = self.key(url, params)
+        entry = self._load(key)
+
+        if self.offline:
+            if entry is None:
+                # What HTTP's only-if-cached answers for a miss
+                self.misses += 1
+                return self._response(url, 504, {}, b'{"message": "not cached"}')
+            self.hits += 1
+            return self._response(url, 200, *entry)
+
+        headers = {}
+        if entry is not None:
+            if "ETag" in entry[0]:
+                headers["If-None-Match"] = entry[0]["ETag"]
+            if "Last-Modified" in entry[0]:
+                headers["If-Modified-Since"] = entry[0]["Last-Modified"]
+
+        response = send(headers)
+        if response.status_code == 304 and entry is not None:
+            self.hits += 1
+            self._touch(key)
+            # Fresh rate limit headers from the 304, everything else cached
+            return self._response(url, 200, {**entry[0], **response.headers}, entry[1])
+
+        self.misses += 1
+        if response.status_code == 200 and (
+            "ETag" in response.headers or "Last-Modified" in response.headers
+        ):
+            kept = {
+                h: response.headers[h] for h in KEPT_HEADERS if h in response.headers
+            }
+            self._store(key, kept, response.content)
+        return response
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return f"{base}.json", f"{base}.body"
+
+    def _load(self, key):
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                headers = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return headers, body
+
+    def _touch(self, key):
+        for path in self._paths(key):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+    def _store(self, key, headers, body):
+        meta_path, body_path = self._paths(key)
+        meta = json.dumps(headers).encode()
+        with self._lock:
+            self._size -= sum(
+                os.path.getsize(p) for p in (meta_path, body_path) if os.path.exists(p)
+            )
+            # Body first, so a readable meta file always has its body
+            for path, data in ((body_path, body), (meta_path, meta)):
+                with open(f"{path}.tmp", "wb") as f:
+                    f.write(data)
+                os.replace(f"{path}.tmp", path)
+            self._size += len(meta) + len(body)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used files until the cache is 90% of its bound."""
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.is_file()),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in entries:
+            if self._size <= self.max_bytes * 0.9:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._size -= size
+
+    def _response(self, url, status_code, headers, body):
+        response = requests.Response()
+        response.url = url
+        response.status_code = status_code
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = "utf-8"
+        response._content = body
+        return response
@@ -0,0 +1,68 @@
+"""
+Incremental CSV output shared by eda.py and github_graphql.py.
+
+The fetchers yield one page at a time and each page is written and flushed
+before the next is requested, so memory stays flat however big the repo is.
+"""
+
+import csv
+
+import pandas as pd
+
+from body_features import FEATURE_COLUMNS
+from profiling import count, span
+
+COLUMNS = [
+    "id",
+    "number",
+    "title",
+    "state",
+    "pr_status",
+    "created_at",
+    "closed_at",
+    "updated_at",
+    "comments",
+    "labels",
+    "type",
+    "author",
+    "assignees",
+    "milestone",
+    "body_length",
+    "reactions",
+    "time_to_close_days",
+    "linked_prs",
+    "is_locked",
+    "participants_count",
+    "url",
+    # Computed from the body, which is not kept (see body_features.py)
+    *FEATURE_COLUMNS,
+]
+
+
+def write_rows(f, writer, rows):
+    """Write one page, given as a list of rows or a frame in COLUMNS order."""
+    with span("csv_write", rows=len(rows)):
+        if isinstance(rows, pd.DataFrame):
+            # Same line endings as csv.writer so both kinds of page mix in one file
+            rows.to_csv(f, header=False, index=False, lineterminator="\r\n")
+        else:
+            writer.writerows(rows)
+    count("rows", len(rows))
+
+
+def write_pages(path, pages, append=False):
+    """
+    Write an iterable of row pages to ``path`` as they arrive.
+    With ``append``, rows are added to an existing file without a new header.
+    Returns the number of rows written.
+    """
+    rows_written = 0
+    with open(path, "a" if append else "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if not append:
+            writer.writerow(COLUMNS)
+        for rows in pages:
+            write_rows(f, writer, rows)
+            f.flush()
+            rows_written += len(rows)
+    return rows_written
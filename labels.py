@@ -0,0 +1,98 @@
+"""
+Normalised issue<->label table over the comma-joined ``labels`` column.
+
+Each distinct label is coded as an integer once, and the (row, label) pairs
+are grouped by code, so the rows carrying a label are a contiguous slice (an
+inverted index). Label counts, label filters and per-label statistics become
+array lookups instead of ``str.contains`` scans over every row.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+class LabelIndex:
+    """
+    Inverted index from label to row positions of the frame it was built from.
+
+    Attributes:
+        labels: Label names; a label's code is its position here
+        rows: Row positions, grouped by label code
+        offsets: ``rows[offsets[code]:offsets[code + 1]]`` are the rows of a label
+        n_rows: Number of rows in the indexed frame
+    """
+
+    def __init__(self, rows, codes, labels, n_rows):
+        order = np.argsort(codes, kind="stable")
+        self.rows = rows[order]
+        self.codes = codes[order]
+        self.labels = pd.Index(labels)
+        self.n_rows = n_rows
+        counts = np.bincount(codes, minlength=len(labels))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    @classmethod
+    def from_lists(cls, lists):
+        """Build from an Arrow list<string> array with one list per row."""
+        if isinstance(lists, pa.ChunkedArray):
+            lists = lists.combine_chunks()
+        rows = pc.list_parent_indices(lists).to_numpy().astype(np.int32)
+        encoded = pc.list_flatten(lists).dictionary_encode()
+        codes = encoded.indices.to_numpy(zero_copy_only=False).astype(np.int32)
+        return cls(rows, codes, encoded.dictionary.to_pylist(), len(lists))
+
+    @classmethod
+    def from_series(cls, labels):
+        """Build from a Series of comma-joined label strings (None for no labels)."""
+        joined = pc.fill_null(pa.array(labels, type=pa.string(), from_pandas=True), "")
+        empty = pa.scalar([], type=pa.list_(pa.string()))
+        lists = pc.if_else(pc.equal(joined, ""), empty, pc.split_pattern(joined, ","))
+        return cls.from_lists(lists)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def code(self, label):
+        """Return the code of ``label``, or -1 if no row carries it."""
+        return self.labels.get_loc(label) if label in self.labels else -1
+
+    def counts(self):
+        """Return the number of rows carrying each label, most common first."""
+        counts = pd.Series(np.diff(self.offsets), index=self.labels, name="count")
+        return counts.sort_values(ascending=False, kind="stable")
+
+    def rows_for(self, label):
+        """Return the row positions carrying ``label``."""
+        code = self.code(label)
+        if code < 0:
+            return self.rows[:0]
+        return self.rows[self.offsets[code]:self.offsets[code + 1]]
+
+    def matching(self, pattern, case=False):
+        """Return the labels whose name matches the regex ``pattern``."""
+        regex = re.compile(pattern, 0 if case else re.IGNORECASE)
+        return [label for label in self.labels if regex.search(label)]
+
+    def mask(self, labels):
+        """Return a boolean array over the rows: True where any of ``labels`` is set."""
+        if isinstance(labels, str):
+            labels = [labels]
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for label in labels:
+            mask[self.rows_for(label)] = True
+        return mask
+
+    def stats(self, values, funcs=("count", "mean", "median")):
+        """
+        Aggregate ``values`` (aligned with the indexed rows) per label.
+        Rows with several labels count towards each of them.
+        """
+        values = np.asarray(values)
+        grouped = pd.Series(values[self.rows]).groupby(self.codes)
+        stats = grouped.agg(list(funcs))
+        stats.index = self.labels[stats.index]
+        return stats
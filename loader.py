@@ -0,0 +1,328 @@
+"""
+Shared loader for the issue exports written by eda.py and github_graphql.py.
+
+The CSV is parsed once per file version and the same DataFrame is handed to
+every caller, so callers must treat the returned frame as read-only.
+
+The first load of a CSV also writes a Parquet sidecar into ``.cache/`` next
+to it. Sidecars are named after a hash of the CSV contents, so a stale one is
+never read, and later loads only read the columns they ask for.
+
+Durations derived from the date columns (``DURATION_COLUMNS``) are computed
+once while parsing and stored in the sidecar with the rest.
+"""
+
+import hashlib
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from body_features import FEATURE_DTYPES
+from labels import LabelIndex
+from profiling import profiled
+
+DEFAULT_PATH = "github_issues.csv"
+CACHE_DIR = ".cache"
+
+# The export read when no path is given; see use_dataset
+_dataset = DEFAULT_PATH
+
+DATE_COLUMNS = [
+    "created_at", "closed_at", "updated_at", "first_response_at", "first_commit_at"
+]
+
+# Derived at load time as float32 days: name -> (end column, start column).
+# Only added when both columns are in the export.
+DURATION_COLUMNS = {
+    "time_to_close": ("closed_at", "created_at"),
+    "time_to_first_response": ("first_response_at", "created_at"),
+    "time_to_first_commit": ("first_commit_at", "created_at"),
+}
+
+# Sidecar row groups, and so the chunks iter_issues reads, hold this many rows
+CHUNK_ROWS = 100_000
+
+# Bumped whenever the sidecar layout changes, so older sidecars are not read
+SIDECAR_VERSION = 2
+
+# Stored as comma-joined strings in the CSV and as list<string> in the sidecar.
+LIST_COLUMNS = ["labels", "assignees"]
+
+# REST ids are integers but GraphQL node ids are strings, so ``id`` stays text.
+DTYPES = {
+    "id": "str",
+    "number": "int64",
+    "title": "str",
+    "state": "category",
+    "pr_status": "category",
+    "comments": "int32",
+    "labels": "str",
+    "type": "category",
+    "author": "str",
+    "assignees": "str",
+    "milestone": "str",
+    "body_length": "int32",
+    "reactions": "int32",
+    "time_to_close_days": "float32",
+    "linked_prs": "int32",
+    "is_locked": "bool",
+    "participants_count": "int32",
+    "url": "str",
+    **FEATURE_DTYPES,
+}
+
+# abspath -> (version, frame, complete); frame may only hold some columns
+_cache = {}
+# abspath -> (version, sha256 hex digest)
+_hashes = {}
+# abspath -> (version, LabelIndex)
+_labels = {}
+
+
+def file_version(path):
+    """Return the (mtime, size) pair used to detect that a file has changed."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_hash(path):
+    """Return the sha256 of ``path``, recomputed only when the file changes."""
+    key = os.path.abspath(path)
+    version = file_version(path)
+    cached = _hashes.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    _hashes[key] = (version, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def sidecar_path(path):
+    """Return the Parquet sidecar path for the current contents of ``path``."""
+    directory, name = os.path.split(os.path.abspath(path))
+    name = f"{name}.{file_hash(path)[:16]}v{SIDECAR_VERSION}.parquet"
+    return os.path.join(directory, CACHE_DIR, name)
+
+
+@profiled("parse")
+def read_issues_csv(path):
+    """Parse an issues CSV with typed columns and the date columns as datetimes."""
+    header = pd.read_csv(path, nrows=0).columns
+    dtypes = {col: dtype for col, dtype in DTYPES.items() if col in header}
+    return parse_columns(pd.read_csv(path, dtype=dtypes))
+
+
+def parse_columns(df):
+    """Convert the date columns of a freshly read frame and add the durations."""
+    for col in DATE_COLUMNS:
+        if col in df:
+            df[col] = pd.to_datetime(df[col], utc=True, format="ISO8601")
+    return add_durations(df)
+
+
+def add_durations(df):
+    """Add the DURATION_COLUMNS whose endpoints are in ``df``, in place."""
+    for col, (end, start) in DURATION_COLUMNS.items():
+        if end in df and start in df:
+            days = (df[end] - df[start]).dt.total_seconds() / (24 * 60 * 60)
+            df[col] = days.astype("float32")
+    return df
+
+
+def frame_to_table(df):
+    """Convert a typed issues frame to a table, with list columns as lists."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        # An all-empty text column (e.g. milestone) would otherwise be typed null
+        if pa.types.is_null(field.type) and DTYPES.get(field.name) == "str":
+            table = table.set_column(i, field.name, table[i].cast(pa.string()))
+    empty = pa.scalar([], type=pa.list_(pa.string()))
+    for col in LIST_COLUMNS:
+        if col in table.column_names:
+            joined = pc.fill_null(table[col], "")
+            split = pc.split_pattern(joined, ",")
+            lists = pc.if_else(pc.equal(joined, ""), empty, split)
+            table = table.set_column(table.schema.get_field_index(col), col, lists)
+    return table
+
+
+@profiled("sidecar_write")
+def write_sidecar(df, path):
+    """Write ``df`` as the Parquet sidecar of the CSV at ``path``."""
+    sidecar = sidecar_path(path)
+    directory, name = os.path.split(sidecar)
+    os.makedirs(directory, exist_ok=True)
+
+    tmp = f"{sidecar}.tmp"
+    pq.write_table(frame_to_table(df), tmp, row_group_size=CHUNK_ROWS)
+    os.replace(tmp, sidecar)
+
+    # Sidecars of older versions of the same CSV can never be read again
+    prefix = name.rsplit(".", 2)[0] + "."
+    for other in os.listdir(directory):
+        if other.startswith(prefix) and other.endswith(".parquet") and other != name:
+            os.remove(os.path.join(directory, other))
+    return sidecar
+
+
+@profiled("sidecar_read")
+def read_sidecar(sidecar, columns=None):
+    """Read ``columns`` from a sidecar into a frame."""
+    return table_to_frame(pq.read_table(sidecar, columns=columns, memory_map=True))
+
+
+def table_to_frame(table):
+    """Convert a table read from a sidecar to a frame, joining the list columns."""
+    for col in LIST_COLUMNS:
+        if col in table.column_names:
+            joined = pc.binary_join(table[col], ",")
+            missing = pa.scalar(None, pa.string())
+            joined = pc.if_else(pc.equal(joined, ""), missing, joined)
+            table = table.set_column(table.schema.get_field_index(col), col, joined)
+    return table.to_pandas()
+
+
+def sidecar_columns(sidecar):
+    """Return the column names stored in a sidecar without reading any data."""
+    return pq.read_schema(sidecar).names
+
+
+def use_dataset(path):
+    """
+    Make ``path`` the export read when no path is given, e.g. in the report's
+    workers, which then load only the columns each analysis asks for.
+    """
+    global _dataset
+    _dataset = path
+
+
+def default_path():
+    """Return the export read when no path is given."""
+    return _dataset
+
+
+def load_issues(path=None, columns=None, use_cache=True):
+    """
+    Return the parsed issues frame for ``path`` (default: ``default_path()``).
+    The file is only re-parsed when its mtime or size changes.
+    Args:
+        columns: Only return these columns; with a sidecar only these are read
+        use_cache: Read and write the Parquet sidecar (default: True)
+    """
+    path = path or _dataset
+    key = os.path.abspath(path)
+    version = file_version(path)
+    cached = _cache.get(key)
+    if cached is None or cached[0] != version:
+        cached = _cache[key] = (version, None, False)
+    _, frame, complete = cached
+
+    if frame is not None and (complete or columns is not None):
+        missing = [] if complete else [c for c in columns if c not in frame]
+        if not missing:
+            return frame if columns is None else frame[columns]
+
+    sidecar = sidecar_path(path) if use_cache else None
+    if sidecar is None or not os.path.exists(sidecar):
+        frame = read_issues_csv(path)
+        if sidecar is not None:
+            try:
+                write_sidecar(frame, path)
+            except OSError as e:
+                print(f"Could not write Parquet cache for {path}: {e}")
+        _cache[key] = (version, frame, True)
+        return frame if columns is None else frame[columns]
+
+    available = sidecar_columns(sidecar)
+    wanted = available if columns is None else columns
+    unknown = [c for c in wanted if c not in available]
+    if unknown:
+        raise KeyError(f"{unknown} not in {path}")
+
+    have = [] if frame is None else list(frame.columns)
+    missing = [c for c in wanted if c not in have]
+    extra = read_sidecar(sidecar, missing)
+    frame = extra if frame is None else pd.concat([frame, extra], axis=1)
+    complete = len(frame.columns) == len(available)
+    if complete:
+        frame = frame[available]
+    _cache[key] = (version, frame, complete)
+    return frame if columns is None else frame[columns]
+
+
+def iter_issues(path=None, columns=None, chunk_rows=CHUNK_ROWS):
+    """
+    Yield the issues of ``path`` as frames of at most ``chunk_rows`` rows,
+    for exports too big to load at once. Row batches of the sidecar are read
+    when there is one, otherwise the CSV is parsed chunk by chunk; either way
+    the chunks are typed like ``load_issues`` frames.
+    """
+    path = path or _dataset
+    sidecar = sidecar_path(path)
+    if os.path.exists(sidecar):
+        parquet = pq.ParquetFile(sidecar, memory_map=True)
+        available = parquet.schema_arrow.names
+        unknown = [c for c in columns or [] if c not in available]
+        if unknown:
+            raise KeyError(f"{unknown} not in {path}")
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield table_to_frame(pa.Table.from_batches([batch]))
+        return
+
+    header = pd.read_csv(path, nrows=0).columns
+    wanted = list(header) + list(DURATION_COLUMNS) if columns is None else columns
+    # Derived columns are computed from their endpoints
+    raw = set(wanted) - set(DURATION_COLUMNS)
+    for col, endpoints in DURATION_COLUMNS.items():
+        if col in wanted:
+            raw.update(endpoints)
+    unknown = [c for c in raw if c not in header]
+    if columns is not None and unknown:
+        raise KeyError(f"{unknown} not in {path}")
+    usecols = [c for c in header if c in raw]
+    dtypes = {col: dtype for col, dtype in DTYPES.items() if col in usecols}
+    reader = pd.read_csv(path, dtype=dtypes, usecols=usecols, chunksize=chunk_rows)
+    with reader:
+        for chunk in reader:
+            chunk = parse_columns(chunk)
+            yield chunk[[c for c in wanted if c in chunk]]
+
+
+def load_labels(path=None, use_cache=True):
+    """
+    Return the LabelIndex of the ``labels`` column of ``path``, built once per
+    file version. Row positions refer to the frame ``load_issues`` returns.
+    """
+    path = path or _dataset
+    key = os.path.abspath(path)
+    version = file_version(path)
+    cached = _labels.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    # The sidecar already holds the labels as lists, so nothing is split here
+    sidecar = sidecar_path(path) if use_cache else None
+    if sidecar is not None and not os.path.exists(sidecar):
+        load_issues(path)
+    if sidecar is not None and os.path.exists(sidecar):
+        lists = pq.read_table(sidecar, columns=["labels"], memory_map=True)["labels"]
+        index = LabelIndex.from_lists(lists)
+    else:
+        labels = load_issues(path, columns=["labels"], use_cache=use_cache)["labels"]
+        index = LabelIndex.from_series(labels)
+    _labels[key] = (version, index)
+    return index
+
+
+def clear_cache():
+    """Drop every cached frame; sidecars on disk are left alone."""
+    _cache.clear()
+    _hashes.clear()
+    _labels.clear()
@@ -0,0 +1,179 @@
+"""
+Opt-in profiling for the crawlers and analyses: where does a slow run spend
+its time and memory?
+
+Stages are wrapped in named spans, as a context manager or a decorator:
+
+    with span("http", url=url):
+        response = session.get(url)
+
+    @profiled("transform")
+    def rest_page_to_frame(items): ...
+
+and counters add up requests, bytes, rows and retries. Nothing is recorded
+until ``enable()`` is called (``--profile`` on eda.py, github_graphql.py and
+analysis.py); until then a span is a shared no-op context manager. ``write_trace``
+saves every span with the counters and the peak RSS, as a Chrome trace
+(open it in chrome://tracing or https://ui.perfetto.dev) or as JSON lines
+when the path ends in ``.jsonl``, and prints a per-stage summary.
+"""
+
+import contextlib
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB."""
+    try:
+        # ru_maxrss carries the parent's peak over fork and exec on Linux
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class Profiler:
+    """Thread-safe collector of spans and counters."""
+
+    def __init__(self):
+        self.enabled = False
+        self.start = time.perf_counter()
+        self.spans = []
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+        self.start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def span(self, name, **args):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            record = {
+                "name": name,
+                "start": start - self.start,
+                "duration": end - start,
+                "thread": threading.get_native_id(),
+                "args": args,
+            }
+            # list.append is atomic, so spans from worker threads need no lock
+            self.spans.append(record)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self):
+        """Total seconds and calls per span name, slowest first."""
+        totals = {}
+        for s in self.spans:
+            seconds, calls = totals.get(s["name"], (0.0, 0))
+            totals[s["name"]] = (seconds + s["duration"], calls + 1)
+        return sorted(totals.items(), key=lambda item: -item[1][0])
+
+    def write_trace(self, path):
+        """Write the spans, counters and peak RSS to ``path`` and print a summary."""
+        wall = time.perf_counter() - self.start
+        peak = round(peak_rss_mb(), 1)
+        if path.endswith(".jsonl"):
+            lines = [{"type": "span", **s} for s in self.spans]
+            lines.append({"type": "counters", **self.counters})
+            lines.append({"type": "run", "seconds": wall, "peak_rss_mb": peak})
+            text = "".join(json.dumps(line) + "\n" for line in lines)
+        else:
+            pid = os.getpid()
+            events = [
+                {
+                    "name": s["name"],
+                    "ph": "X",
+                    "ts": s["start"] * 1e6,
+                    "dur": s["duration"] * 1e6,
+                    "pid": pid,
+                    "tid": s["thread"],
+                    "args": s["args"],
+                }
+                for s in self.spans
+            ]
+            events.append(
+                {
+                    "name": "counters",
+                    "ph": "C",
+                    "ts": wall * 1e6,
+                    "pid": pid,
+                    "args": dict(self.counters, peak_rss_mb=peak),
+                }
+            )
+            text = json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+        print(f"Profile: {wall:.2f}s, peak RSS {peak} MB, trace in {path}")
+        for name, (seconds, calls) in self.summary():
+            print(f"  {name:<24} {seconds:10.3f}s {calls:8d} calls")
+        for name, value in sorted(self.counters.items()):
+            print(f"  {name:<24} {value:>19,}")
+        return path
+
+
+# Shared by every module of the process
+profiler = Profiler()
+
+
+def enable():
+    profiler.enable()
+
+
+_DISABLED = contextlib.nullcontext()
+
+
+def span(name, **args):
+    """Time the enclosed block as a span called ``name``, with ``args`` attached."""
+    if not profiler.enabled:
+        return _DISABLED
+    return profiler.span(name, **args)
+
+
+def count(name, n=1):
+    """Add ``n`` to the counter ``name``."""
+    profiler.count(name, n)
+
+
+def profiled(name=None):
+    """Decorator: time every call of the function as a span."""
+
+    def decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def write_trace(path):
+    return profiler.write_trace(path)
@@ -0,0 +1,141 @@
+"""
+Request pacing shared by the REST (eda.py) and GraphQL (github_graphql.py)
+crawlers, driven by what GitHub reports about the remaining budget.
+
+Requests go out as fast as GitHub's secondary limits allow, never more than
+the per-minute point budget in any 60 second window, while the primary
+budget lasts. Once the budget is spent, every
+worker waits for the reset time, and a ``Retry-After`` header pauses them
+for as long as GitHub asks.
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+# Secondary rate limits: 900 points/minute for REST, 2000 for GraphQL
+REST_POINTS_PER_MINUTE = 900
+GRAPHQL_POINTS_PER_MINUTE = 2000
+
+# Fallback pause when GitHub rejects a request without saying for how long
+DEFAULT_RETRY_AFTER = 60
+
+# What the body of a 403 for GitHub's secondary rate limits says
+SECONDARY_RATE_LIMIT = "secondary rate limit"
+
+
+def retry_after_seconds(value):
+    """Seconds to wait from a Retry-After header: delay-seconds or an HTTP date."""
+    try:
+        return int(value)
+    except ValueError:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+
+
+class RateLimiter:
+    """
+    Thread-safe scheduler that hands out request slots.
+
+    Call ``wait()`` before each request and one of the ``update_*`` methods
+    with what came back.
+    """
+
+    def __init__(self, points_per_minute=REST_POINTS_PER_MINUTE):
+        self.remaining = None
+        self.reset_at = None
+        self.cost = 1
+        # Send times of the last points_per_minute requests (1 point each)
+        self._sent = deque(maxlen=points_per_minute)
+        self._not_before = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until this caller may send its next request."""
+        with self._lock:
+            now = time.time()
+            slot = max(self._not_before, now)
+            if len(self._sent) == self._sent.maxlen:
+                slot = max(slot, self._sent[0] + 60)
+            if self.remaining is not None and self.remaining < self.cost:
+                # Budget spent: hold everyone until it resets. ``remaining``
+                # stays spent until a response reports the new budget
+                if self.reset_at is not None and self.reset_at + 1 > self._not_before:
+                    if self.reset_at > slot:
+                        print(
+                            f"Rate limit exhausted, waiting {self.reset_at - now:.0f}s"
+                        )
+                    self._not_before = self.reset_at + 1
+                    slot = max(slot, self._not_before)
+            elif self.remaining is not None:
+                # Count the request now so concurrent workers see it too
+                self.remaining -= self.cost
+            self._sent.append(slot)
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds):
+        """Hold every worker for ``seconds``, e.g. from a Retry-After header."""
+        with self._lock:
+            self._not_before = max(self._not_before, time.time() + seconds)
+
+    def update_from_headers(self, status_code, headers, body=""):
+        """
+        Record the budget from a response's X-RateLimit-* headers.
+        Returns True when the request was rate limited and should be retried;
+        any other 403 (a permission error, say) is not.
+        """
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        with self._lock:
+            if remaining is not None:
+                self.remaining = int(remaining)
+            if reset is not None:
+                self.reset_at = int(reset)
+
+        if status_code not in (403, 429):
+            return False
+        # Following GitHub's guidance: honour Retry-After, otherwise wait for
+        # the reset when the budget is spent (wait() does), otherwise back off
+        # a minute from a secondary rate limit
+        if "Retry-After" in headers:
+            self.pause(retry_after_seconds(headers["Retry-After"]))
+            return True
+        if remaining == "0":
+            return True
+        if status_code == 429 or SECONDARY_RATE_LIMIT in (body or "").lower():
+            self.pause(DEFAULT_RETRY_AFTER)
+            return True
+        return False
+
+    def update_from_graphql(self, rate_limit):
+        """Record the budget from a GraphQL ``rateLimit { cost remaining resetAt }``."""
+        reset_at = datetime.fromisoformat(rate_limit["resetAt"].replace("Z", "+00:00"))
+        with self._lock:
+            self.cost = max(rate_limit["cost"], 1)
+            self.remaining = rate_limit["remaining"]
+            self.reset_at = reset_at.timestamp()
+
+    def update_from_graphql_errors(self, errors, headers=None):
+        """
+        Hold every worker until the budget resets when the ``errors`` of a
+        GraphQL response (sent with a 200) include RATE_LIMITED. Returns True
+        when they did and the request should be retried.
+        """
+        if not any(
+            isinstance(error, dict) and error.get("type") == "RATE_LIMITED"
+            for error in errors or []
+        ):
+            return False
+        reset = (headers or {}).get("X-RateLimit-Reset")
+        with self._lock:
+            if reset is not None:
+                self.reset_at = int(reset)
+            reset_at = self.reset_at
+        now = time.time()
+        if reset_at is not None and reset_at > now:
+            self.pause(reset_at + 1 - now)
+        else:
+            self.pause(DEFAULT_RETRY_AFTER)
+        return True
@@ -0,0 +1,218 @@
+"""
+Headless report over an issues export: runs analyses from analysis.py across
+a process pool and saves their figures instead of showing them.
+
+The parent process writes the loader's Parquet sidecar once. Workers never
+hold the whole export: each analysis runs without a frame and reads only the
+columns it asks for from the memory-mapped sidecar, cached per worker. With
+repository or date filters, the workers read just the matching partitions of
+the store instead.
+Figures are rendered with the Agg backend. Each analysis gets its figures,
+printed output and return value written under the output directory, and
+``index.html`` links them together.
+"""
+
+import argparse
+import contextlib
+import html
+import io
+import os
+import time
+import traceback
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+
+import analysis  # noqa: E402
+from loader import DEFAULT_PATH, clear_cache, load_issues, use_dataset  # noqa: E402
+from store import load_store  # noqa: E402
+
+OUTPUT_DIR = "report"
+
+DEFAULT_ANALYSES = [
+    "analysis",
+    "number_of_days_for_each_issue",
+    "most_active_issue_creators",
+    "most_active_pr_authors",
+    "analyze_issue_labels",
+    "analyze_first_response_time",
+    "analyze_issue_patterns",
+    "analyze_issue_complexity",
+    "analyze_user_engagement",
+    "analyze_contributor_retention",
+    "analyze_collaboration_patterns",
+    "analyze_newcomer_experience",
+    "analyze_community_growth",
+    "analyze_contribution_diversity",
+    "analyze_resolution_rate",
+    "analyze_priority_response",
+    "analyze_label_word_cloud",
+    "analyze_title_word_cloud",
+    "analyze_seasonal_patterns",
+    "analyze_issue_size_metrics",
+    "analyze_user_interactions",
+    "analyze_issue_templates",
+    "analyze_time_to_first_commit",
+]
+
+_source = None
+_df = None
+
+
+def _init_worker(source):
+    global _source
+    _source = source
+    if not isinstance(source, dict):
+        # Analyses run without a frame read their columns of this export
+        use_dataset(source)
+    # plt.show() is a no-op under Agg; the figures are saved afterwards
+    warnings.filterwarnings("ignore", message=".*non-interactive.*")
+
+
+def run_analysis(name, output_dir, fmt="png"):
+    """
+    Run one analysis against the worker's dataset and save every figure it
+    draws. Returns a dict describing the outcome for the index.
+    """
+    global _df
+    # The store's partitions are filtered into one frame; a CSV export is
+    # read column by column through the loader instead
+    if _df is None and isinstance(_source, dict):
+        _df = load_store(**_source)
+    df = _df
+    output = io.StringIO()
+    result = error = None
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        try:
+            result = getattr(analysis, name)(df=df)
+        except Exception:
+            error = traceback.format_exc()
+
+    figures = []
+    for i, number in enumerate(plt.get_fignums(), 1):
+        filename = f"{name}_{i}.{fmt}"
+        plt.figure(number).savefig(os.path.join(output_dir, filename), format=fmt)
+        figures.append(filename)
+    plt.close("all")
+
+    return {
+        "name": name,
+        "seconds": time.perf_counter() - start,
+        "figures": figures,
+        "output": output.getvalue(),
+        "result": None if result is None else str(result),
+        "error": error,
+    }
+
+
+def write_index(results, output_dir, title):
+    """Write ``index.html`` listing each analysis with its figures and output."""
+    parts = [
+        "<!DOCTYPE html>",
+        f"<html><head><meta charset='utf-8'><title>{html.escape(title)}</title></head>",
+        f"<body><h1>Report for {html.escape(title)}</h1>",
+        "<ul>",
+    ]
+    parts += [
+        f"<li><a href='#{r['name']}'>{r['name']}</a> ({r['seconds']:.2f}s)"
+        + (" &mdash; failed" if r["error"] else "")
+        + "</li>"
+        for r in results
+    ]
+    parts.append("</ul>")
+    for r in results:
+        parts.append(f"<h2 id='{r['name']}'>{r['name']}</h2>")
+        for text in (r["output"], r["result"], r["error"]):
+            if text:
+                parts.append(f"<pre>{html.escape(text)}</pre>")
+        parts += [f"<img src='{name}' alt='{name}'>" for name in r["figures"]]
+    parts.append("</body></html>")
+
+    index = os.path.join(output_dir, "index.html")
+    with open(index, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+    return index
+
+
+def build_report(
+    path=DEFAULT_PATH,
+    analyses=None,
+    output_dir=OUTPUT_DIR,
+    fmt="png",
+    max_workers=None,
+    repos=None,
+    since=None,
+    until=None,
+):
+    """
+    Run ``analyses`` (names of functions in analysis.py) over the export at
+    ``path`` in parallel and write their figures and an index to ``output_dir``.
+    With ``repos``, ``since`` or ``until`` the data comes from the matching
+    partitions of the store instead. Returns the path of the index.
+    """
+    analyses = analyses or DEFAULT_ANALYSES
+    unknown = [name for name in analyses if not callable(getattr(analysis, name, None))]
+    if unknown:
+        raise ValueError(f"Unknown analyses: {unknown}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    if repos or since or until:
+        source = {"repos": repos, "since": since, "until": until}
+        title = ", ".join(repos or ["all repositories"])
+        if since or until:
+            title += f" ({since or '...'} to {until or '...'})"
+    else:
+        source = title = path
+        # Parse once here so every worker finds the sidecar and only maps it,
+        # without forking copies of this process's frame into them
+        load_issues(path)
+        clear_cache()
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers, initializer=_init_worker, initargs=(source,)
+    ) as executor:
+        futures = [
+            executor.submit(run_analysis, name, output_dir, fmt) for name in analyses
+        ]
+        results = [future.result() for future in futures]
+
+    for r in results:
+        status = "failed" if r["error"] else f"{len(r['figures'])} figure(s)"
+        print(f"{r['name']}: {status} in {r['seconds']:.2f}s")
+    return write_index(results, output_dir, title)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("analyses", nargs="*", help="analyses to run (default: all)")
+    parser.add_argument("--path", default=DEFAULT_PATH, help="issues CSV to report on")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="directory to write to")
+    parser.add_argument("--format", default="png", choices=["png", "svg"])
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPUs)")
+    parser.add_argument(
+        "--repo",
+        action="append",
+        help="report on owner/repo from the store (repeatable)",
+    )
+    parser.add_argument("--since", help="only issues created on or after this date")
+    parser.add_argument("--until", help="only issues created before this date")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = build_report(
+        args.path,
+        args.analyses,
+        args.output,
+        args.format,
+        args.workers,
+        args.repo,
+        args.since,
+        args.until,
+    )
+    print(f"Report written to {index} in {time.perf_counter() - start:.1f}s")
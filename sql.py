@@ -0,0 +1,164 @@
+"""
+Optional SQL backend: the issue data as a table in an embedded DuckDB.
+
+The ``issues`` view reads the loader's Parquet sidecar of a CSV export, or
+every partition of the store, in place. DuckDB runs the aggregations on all
+cores and spills to disk when they outgrow memory, and ad-hoc questions are
+one query away:
+
+    uv run sql.py "SELECT type, count(*) FROM issues GROUP BY type"
+    uv run sql.py top_authors --param type=issue --param n=5
+
+``labels`` and ``assignees`` are lists, so ``unnest`` gives one row per label
+or assignee. DuckDB is optional (``uv add duckdb``); the analyses in
+analysis.py that take ``backend="sql"`` run these queries instead of pandas.
+"""
+
+import argparse
+import os
+
+from loader import DEFAULT_PATH, load_issues, sidecar_path
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Group-by analyses of analysis.py as SQL; $name marks a parameter
+QUERIES = {
+    "issues_per_month": """
+        SELECT date_trunc('month', created_at) AS month, count(*) AS issues
+        FROM issues
+        GROUP BY month
+        ORDER BY month
+    """,
+    "resolution_rate": """
+        WITH created AS (
+            SELECT date_trunc('month', created_at) AS month, count(*) AS n
+            FROM issues GROUP BY month
+        ), closed AS (
+            SELECT date_trunc('month', closed_at) AS month, count(*) AS n
+            FROM issues WHERE closed_at IS NOT NULL GROUP BY month
+        ), cumulative AS (
+            SELECT
+                month,
+                sum(coalesce(created.n, 0)) OVER (ORDER BY month)::BIGINT AS created,
+                sum(coalesce(closed.n, 0)) OVER (ORDER BY month)::BIGINT AS closed
+            FROM created FULL JOIN closed USING (month)
+        )
+        SELECT month, created, closed, 100.0 * closed / created AS resolution_rate
+        FROM cumulative
+        ORDER BY month
+    """,
+    "top_authors": """
+        SELECT author, count(*) AS count
+        FROM issues
+        WHERE type = $type AND author IS NOT NULL
+        GROUP BY author
+        ORDER BY count DESC, author
+        LIMIT $n
+    """,
+    "top_merged_pr_authors": """
+        SELECT author, count(*) AS count
+        FROM issues
+        WHERE type = 'pull_request' AND state = 'MERGED' AND author IS NOT NULL
+        GROUP BY author
+        ORDER BY count DESC, author
+        LIMIT $n
+    """,
+    "monthly_unique_authors": """
+        SELECT
+            date_trunc('month', created_at) AS month,
+            count(DISTINCT author) AS authors
+        FROM issues
+        GROUP BY month
+        ORDER BY month
+    """,
+    "label_counts": """
+        SELECT label, count(*) AS count
+        FROM (SELECT unnest(labels) AS label FROM issues)
+        GROUP BY label
+        ORDER BY count DESC, label
+    """,
+    "user_assignee_pairs": """
+        SELECT author, assignee, count(*) AS count
+        FROM (SELECT author, unnest(assignees) AS assignee FROM issues)
+        WHERE author IS NOT NULL
+        GROUP BY author, assignee
+        ORDER BY count DESC, author, assignee
+        LIMIT $n
+    """,
+    # Each distinct set of assignees once, as analyze_user_interactions groups
+    "user_interactions": """
+        SELECT author, array_to_string(assignees, ',') AS assignees, count(*) AS count
+        FROM issues
+        WHERE author IS NOT NULL AND len(assignees) > 0
+        GROUP BY author, issues.assignees
+        ORDER BY count DESC, author, assignees
+        LIMIT $n
+    """,
+}
+
+
+def _quote(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def connect(path=DEFAULT_PATH, root=None, threads=None, memory_limit=None):
+    """
+    Return a DuckDB connection with an ``issues`` view over the export at
+    ``path``, or over the partitioned store at ``root``.
+    Args:
+        threads: Worker threads (default: DuckDB's, one per core)
+        memory_limit: e.g. "4GB"; larger aggregations spill to disk
+    """
+    if duckdb is None:
+        raise ImportError("The SQL backend needs duckdb: uv add duckdb")
+
+    con = duckdb.connect()
+    # Months and days in UTC, like the pandas analyses
+    con.execute("SET TimeZone = 'UTC'")
+    if threads is not None:
+        con.execute(f"SET threads = {int(threads)}")
+    if memory_limit is not None:
+        con.execute(f"SET memory_limit = {_quote(memory_limit)}")
+
+    if root is not None:
+        files = _quote(os.path.join(root, "**", "*.parquet"))
+        # Older partitions lack columns added since; they read as NULL
+        options = "hive_partitioning = true, union_by_name = true"
+        source = f"read_parquet({files}, {options})"
+    else:
+        # The loader writes the sidecar the first time it parses the CSV
+        sidecar = sidecar_path(path)
+        if not os.path.exists(sidecar):
+            load_issues(path)
+        source = f"read_parquet({_quote(sidecar)})"
+    con.execute(f"CREATE VIEW issues AS SELECT * FROM {source}")
+    return con
+
+
+def query(sql, con=None, **params):
+    """
+    Run ``sql``, or the name of one of QUERIES, and return a DataFrame.
+    ``params`` fill in the query's $name parameters.
+    """
+    con = con or connect()
+    return con.execute(QUERIES.get(sql, sql), params or None).df()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sql", help=f"a query, or one of: {', '.join(QUERIES)}")
+    parser.add_argument("--path", default=DEFAULT_PATH, help="issues CSV to query")
+    parser.add_argument("--root", help="query the partitioned store here instead")
+    parser.add_argument(
+        "--param", action="append", default=[], help="query parameter as name=value"
+    )
+    args = parser.parse_args()
+
+    params = {}
+    for param in args.param:
+        name, value = param.split("=", 1)
+        params[name] = int(value) if value.isdigit() else value
+    print(query(args.sql, connect(args.path, args.root), **params).to_string())
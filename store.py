@@ -0,0 +1,166 @@
+"""
+Partitioned Parquet store for the issues of many repositories.
+
+Both crawlers can write into it (``--store``) and existing CSV exports can be
+imported. The layout is hive-style, so the partition values are in the paths:
+
+    issues_store/owner=<owner>/repo=<repo>/month=<YYYY-MM>/data.parquet
+
+``month`` is the month of ``created_at``, which never changes, so an item
+always lands in the same partition and re-fetching it replaces it there.
+``load_store`` filters by repository and date range, and only partitions
+matching the filter are opened.
+"""
+
+import argparse
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from issue_writer import COLUMNS
+from loader import DTYPES, frame_to_table, iter_issues, parse_columns, table_to_frame
+from profiling import profiled
+
+STORE_DIR = "issues_store"
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("owner", pa.string()), ("repo", pa.string()), ("month", pa.string())]),
+    flavor="hive",
+)
+
+
+def partition_path(owner, repo, month, root=STORE_DIR):
+    return os.path.join(
+        root, f"owner={owner}", f"repo={repo}", f"month={month}", "data.parquet"
+    )
+
+
+def typed_frame(rows):
+    """Type a page of crawled rows (a frame or row lists) like the loader does."""
+    if isinstance(rows, pd.DataFrame):
+        df = rows.copy()
+    else:
+        df = pd.DataFrame(rows, columns=COLUMNS)
+    for col, dtype in DTYPES.items():
+        if col not in df:
+            continue
+        if dtype == "str":
+            # REST ids arrive as ints; keep missing values missing
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        elif dtype != "category":
+            df[col] = df[col].astype(dtype)
+    return parse_columns(df)
+
+
+def _to_table(df):
+    table = frame_to_table(df)
+    for i, field in enumerate(table.schema):
+        # Categories differ between pages, so store plain strings
+        if pa.types.is_dictionary(field.type) or pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table[i].cast(pa.string()))
+    return table
+
+
+@profiled("store_write")
+def upsert(df, owner, repo, root=STORE_DIR):
+    """
+    Write a typed issues frame into the partitions of ``owner/repo``,
+    replacing stored rows with the same id. Returns the number of rows.
+    """
+    months = df["created_at"].dt.strftime("%Y-%m")
+    for month, part in df.groupby(months, sort=False):
+        path = partition_path(owner, repo, month, root)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = _to_table(part)
+        if os.path.exists(path):
+            existing = pq.read_table(path)
+            kept = existing.filter(pc.invert(pc.is_in(existing["id"], table["id"])))
+            table = pa.concat_tables([kept, table], promote_options="default")
+        tmp = f"{path}.tmp"
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+    return len(df)
+
+
+def store_pages(pages, owner, repo, root=STORE_DIR):
+    """Upsert each crawled page into the store as it passes through."""
+    for rows in pages:
+        upsert(typed_frame(rows), owner, repo, root)
+        yield rows
+
+
+def import_csv(path, owner, repo, root=STORE_DIR):
+    """Copy an existing issues CSV into the store, one chunk at a time."""
+    rows = sum(upsert(chunk, owner, repo, root) for chunk in iter_issues(path))
+    print(f"Imported {rows} rows of {owner}/{repo} from {path}")
+    return rows
+
+
+def repositories(root=STORE_DIR):
+    """Return the ``owner/repo`` names in the store."""
+    return sorted(
+        f"{owner[len('owner='):]}/{repo[len('repo='):]}"
+        for owner in os.listdir(root)
+        for repo in os.listdir(os.path.join(root, owner))
+    )
+
+
+def load_store(repos=None, since=None, until=None, columns=None, root=STORE_DIR):
+    """
+    Return the issues of the store as one frame with ``owner`` and ``repo``
+    columns, typed like ``load_issues``.
+    Args:
+        repos: Only these ``owner/repo`` names (default: all)
+        since: Only issues created at or after this date
+        until: Only issues created before this date
+        columns: Only these columns besides owner and repo
+    """
+    dataset = ds.dataset(root, format="parquet", partitioning=PARTITIONING)
+    # Partitions written before a column was added lack it; read them as nulls
+    fragments = [f.physical_schema for f in dataset.get_fragments()]
+    schema = pa.unify_schemas([dataset.schema, *fragments])
+    dataset = ds.dataset(
+        root, schema=schema, format="parquet", partitioning=PARTITIONING
+    )
+    conditions = []
+    if repos:
+        selected = None
+        for name in repos:
+            owner, repo = name.split("/")
+            match = (ds.field("owner") == owner) & (ds.field("repo") == repo)
+            selected = match if selected is None else selected | match
+        conditions.append(selected)
+    # The month conditions prune partitions, the created_at ones trim the edges
+    if since is not None:
+        since = pd.Timestamp(since, tz="UTC")
+        conditions.append(ds.field("month") >= since.strftime("%Y-%m"))
+        conditions.append(ds.field("created_at") >= since.to_pydatetime())
+    if until is not None:
+        until = pd.Timestamp(until, tz="UTC")
+        conditions.append(ds.field("month") <= until.strftime("%Y-%m"))
+        conditions.append(ds.field("created_at") < until.to_pydatetime())
+
+    condition = None
+    for c in conditions:
+        condition = c if condition is None else condition & c
+    wanted = None if columns is None else ["owner", "repo"] + list(columns)
+    df = table_to_frame(dataset.to_table(columns=wanted, filter=condition))
+
+    for col in ["owner", "repo"] + [c for c, t in DTYPES.items() if t == "category"]:
+        if col in df:
+            df[col] = df[col].astype("category")
+    return df.drop(columns="month", errors="ignore")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", help="issues CSV to import")
+    parser.add_argument("repository", help="owner/repo the CSV was crawled from")
+    parser.add_argument("--root", default=STORE_DIR)
+    args = parser.parse_args()
+    owner, repo = args.repository.split("/")
+    import_csv(args.path, owner, repo, args.root)
@@ -0,0 +1,142 @@
+"""
+Incremental refresh of an existing issues CSV.
+
+The largest ``updated_at`` already in the dataset is kept in a small state
+file next to the CSV. A nightly run only fetches items updated since then
+and upserts them by ``id``, streaming the existing file rather than
+loading it.
+"""
+
+import csv
+import json
+import os
+
+import pandas as pd
+
+from issue_writer import COLUMNS, write_rows
+from profiling import span
+
+ID_INDEX = COLUMNS.index("id")
+UPDATED_AT_INDEX = COLUMNS.index("updated_at")
+
+# Incoming rows counted into the views at a time
+VIEW_BATCH = 10_000
+
+
+def state_path(path):
+    return f"{path}.sync.json"
+
+
+def scan_watermark(path):
+    """Return the largest updated_at in the CSV at ``path``, or None if empty."""
+    watermark = None
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            # ISO 8601 UTC timestamps sort the same as strings
+            if row[UPDATED_AT_INDEX] and (
+                watermark is None or row[UPDATED_AT_INDEX] > watermark
+            ):
+                watermark = row[UPDATED_AT_INDEX]
+    return watermark
+
+
+def read_watermark(path):
+    """
+    Return the updated_at watermark for the dataset at ``path``.
+    Falls back to scanning the CSV when no state file has been written yet.
+    """
+    if os.path.exists(state_path(path)):
+        with open(state_path(path), encoding="utf-8") as f:
+            return json.load(f)["updated_at"]
+    if os.path.exists(path):
+        return scan_watermark(path)
+    return None
+
+
+def write_watermark(path, updated_at):
+    tmp = f"{state_path(path)}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"updated_at": updated_at}, f)
+    os.replace(tmp, state_path(path))
+
+
+def upsert_pages(path, pages, views=None):
+    """
+    Merge pages of freshly fetched rows into the CSV at ``path``, replacing
+    rows with the same id. An item fetched more than once (updated while the
+    crawl was paging, so it moved to a later page) keeps its last copy.
+    Returns the number of items upserted.
+
+    ``views`` (aggregates.Views of the CSV as it was) are updated with the
+    new rows and the rows they replace, and saved along with the CSV.
+    """
+    incoming = f"{path}.incoming"
+    merged = f"{path}.merged"
+    # id -> position of its last row in the spool
+    last_rows = {}
+    spooled = 0
+    watermark = read_watermark(path)
+
+    # Spool the new rows first so only their ids have to be held in memory
+    with open(incoming, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        for rows in pages:
+            if isinstance(rows, pd.DataFrame):
+                page_ids = rows["id"].astype(str)
+                latest = rows["updated_at"].dropna().max() if len(rows) else None
+            else:
+                page_ids = [str(row[ID_INDEX]) for row in rows]
+                latest = max(
+                    (row[UPDATED_AT_INDEX] for row in rows if row[UPDATED_AT_INDEX]),
+                    default=None,
+                )
+            for id_ in page_ids:
+                last_rows[id_] = spooled
+                spooled += 1
+            if isinstance(latest, str) and (watermark is None or latest > watermark):
+                watermark = latest
+            write_rows(f, writer, rows)
+
+    replaced = []
+    with span("csv_merge"), open(merged, "w", newline="", encoding="utf-8") as out:
+        writer = csv.writer(out)
+        writer.writerow(COLUMNS)
+        if os.path.exists(path):
+            with open(path, newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                for row in reader:
+                    if row[ID_INDEX] not in last_rows:
+                        writer.writerow(row)
+                    elif views is not None:
+                        # The old version leaves the views; the new one is in
+                        replaced.append(row)
+        with open(incoming, newline="", encoding="utf-8") as f:
+            batch = []
+            for position, row in enumerate(csv.reader(f)):
+                if last_rows[row[ID_INDEX]] != position:
+                    continue
+                batch.append(row)
+                if len(batch) == VIEW_BATCH:
+                    _write_incoming(writer, batch, views)
+                    batch = []
+            _write_incoming(writer, batch, views)
+
+    os.replace(merged, path)
+    os.remove(incoming)
+    if views is not None:
+        if replaced:
+            views.remove(replaced)
+        views.save(path)
+    if watermark is not None:
+        write_watermark(path, watermark)
+    print(f"Upserted {len(last_rows)} items into {path}")
+    return len(last_rows)
+
+
+def _write_incoming(writer, rows, views):
+    writer.writerows(rows)
+    if views is not None and rows:
+        views.add(rows)
@@ -0,0 +1,84 @@
+"""
+Term frequencies of labels and free text, for word clouds and keyword counts.
+
+Labels are terms as they are: "type-bug" or "good first issue" is counted
+once per row carrying it, straight from a LabelIndex. Titles and bodies are
+lowercased and split into words with Arrow string kernels, without a Python
+loop over rows. Both are ``chunked.ValueCounts``, so they are updated one
+chunk at a time and merged with counts of other chunks, files or crawls,
+and ``frequencies`` hands the result to ``WordCloud.generate_from_frequencies``
+without it re-tokenising anything.
+"""
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from wordcloud import STOPWORDS
+
+from chunked import ValueCounts
+from labels import LabelIndex
+
+# Anything but letters, digits and the _ ' - that occur inside words
+SEPARATORS = r"[^\pL\pN_'-]+"
+
+MIN_LENGTH = 3
+
+
+def tokens(texts, stopwords=STOPWORDS, min_length=MIN_LENGTH):
+    """Return the words of a Series of texts, lowercased, as a flat Arrow array."""
+    texts = pa.array(texts, type=pa.string(), from_pandas=True)
+    words = pc.list_flatten(pc.split_pattern_regex(pc.utf8_lower(texts), SEPARATORS))
+    words = pc.utf8_trim(words, "'-")
+    keep = pc.and_(
+        pc.greater_equal(pc.utf8_length(words), min_length),
+        pc.invert(pc.match_substring_regex(words, r"^\pN+$")),
+    )
+    if stopwords:
+        keep = pc.and_(keep, pc.invert(pc.is_in(words, pa.array(list(stopwords)))))
+    return words.filter(keep)
+
+
+class LabelTerms(ValueCounts):
+    """Rows per label, from the comma-joined ``labels`` column."""
+
+    def __init__(self, columns="labels", key=None):
+        super().__init__(columns, key)
+
+    @classmethod
+    def from_index(cls, index):
+        """Counts of an existing LabelIndex, e.g. the cached ``load_labels()``."""
+        terms = cls()
+        terms.merge_counts(index.counts())
+        return terms
+
+    def update(self, chunk):
+        self.merge_counts(LabelIndex.from_series(self.values(chunk)).counts())
+
+
+class TextTerms(ValueCounts):
+    """Occurrences of each word in a text column, titles by default."""
+
+    def __init__(
+        self, columns="title", key=None, stopwords=STOPWORDS, min_length=MIN_LENGTH
+    ):
+        super().__init__(columns, key)
+        self.stopwords = stopwords
+        self.min_length = min_length
+
+    def update(self, chunk):
+        words = tokens(self.values(chunk), self.stopwords, self.min_length)
+        counts = pc.value_counts(words)
+        self.merge_counts(
+            pd.Series(
+                counts.field("counts").to_numpy(),
+                index=counts.field("values").to_pandas(),
+            )
+        )
+
+
+def frequencies(counts, max_words=None):
+    """The ``max_words`` most common terms as a dict for WordCloud."""
+    if isinstance(counts, ValueCounts):
+        counts = counts.result()
+    counts = counts if max_words is None else counts.head(max_words)
+    return {str(term): int(count) for term, count in counts.items()}
@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+
+import github_graphql
+from benchmarks.synthetic import generate_frame, graphql_nodes
+from body_features import load_vectors, vectorizer, vectors_dir, write_vectors
+
+
+def test_parts_are_numbered_past_the_newest(tmp_path):
+    path = str(tmp_path / "issues.csv")
+    for i in range(3):
+        write_vectors(path, [f"id{i}"], [f"body {i}"])
+    for name in ["part-000000.npz", "part-000001.npz"]:
+        os.remove(os.path.join(vectors_dir(path), name))
+    open(os.path.join(vectors_dir(path), "notes.txt"), "w").close()
+
+    part = write_vectors(path, ["id3"], ["body 3"])
+
+    assert os.path.basename(part) == "part-000003.npz"
+    ids, matrix = load_vectors(path)
+    assert ids.tolist() == ["id2", "id3"]
+    assert matrix.shape[0] == 2
+
+
+def test_latest_part_wins(tmp_path):
+    # The second page refetches id1, e.g. after an interrupted crawl
+    path = str(tmp_path / "issues.csv")
+    write_vectors(path, ["id0", "id1"], ["old text", "old text"])
+    write_vectors(path, ["id1"], ["new words"])
+
+    ids, matrix = load_vectors(path)
+
+    assert ids.tolist() == ["id0", "id1"]
+    expected = vectorizer().transform(["new words"]).toarray()
+    np.testing.assert_array_equal(matrix[1].toarray(), expected)
+
+
+def test_vectors_are_written_after_their_rows(tmp_path, monkeypatch):
+    path = str(tmp_path / "issues.csv")
+    nodes = [node for _, node in graphql_nodes(generate_frame(5, seed=4))]
+    page_info = {"hasNextPage": False, "endCursor": "cursor"}
+    monkeypatch.setattr(
+        github_graphql,
+        "fetch_data",
+        lambda since, checkpoint: iter([("issue", nodes, page_info)]),
+    )
+    checkpoint = {"offset": 0, "streams": {}}
+    pages = github_graphql.transformed_pages(path=path, checkpoint=checkpoint)
+
+    # Interrupted before the batch was written: neither vectors nor checkpoint
+    next(pages)
+    assert not os.path.exists(vectors_dir(path))
+    assert not os.path.exists(github_graphql.checkpoint_path(path))
+
+    open(path, "w").close()
+    list(pages)
+    assert len(load_vectors(path)[0]) == 5
+    assert github_graphql.load_checkpoint(path)["streams"]["issue"]["done"]
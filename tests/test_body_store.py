@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+import pytest
+
+from body_store import BLOCK_DTYPE, INDEX_DTYPE, BodyStore
+
+pytest.importorskip("zstandard")
+
+
+def test_append_after_an_interrupted_append(tmp_path):
+    directory = str(tmp_path / "bodies")
+    store = BodyStore(directory)
+    store.append(["1", "2"], ["first body", "second body"])
+
+    # An append that died after its data, blocks and index rows but halfway
+    # through its ids, mid-line
+    with open(os.path.join(directory, "data.zst"), "ab") as f:
+        f.write(b"partial frame")
+    with open(os.path.join(directory, "blocks.bin"), "ab") as f:
+        f.write(np.array([(999, 13)], dtype=BLOCK_DTYPE).tobytes())
+    with open(os.path.join(directory, "index.bin"), "ab") as f:
+        f.write(np.array([(1, 0, 4), (1, 4, 4)], dtype=INDEX_DTYPE).tobytes())
+    with open(os.path.join(directory, "ids.txt"), "ab") as f:
+        f.write(b"3")
+
+    store = BodyStore(directory)
+    assert len(store) == 2
+    store.append(["4", "5"], ["fourth body", None])
+
+    store = BodyStore(directory)
+    assert store.ids == ["1", "2", "4", "5"]
+    assert dict(store.iter_bodies()) == {
+        "1": "first body",
+        "2": "second body",
+        "4": "fourth body",
+        "5": "",
+    }
@@ -0,0 +1,49 @@
+import matplotlib
+import pandas as pd
+import pytest
+
+import analysis
+from benchmarks.synthetic import generate_frame
+from issue_writer import write_pages
+
+pytest.importorskip("duckdb")
+matplotlib.use("Agg")
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / "issues.csv")
+    write_pages(path, iter([generate_frame(3_000, seed=3)]))
+    return path
+
+
+def test_top_authors_match(path):
+    for name in ["most_active_issue_creators", "most_active_pr_authors"]:
+        expected = getattr(analysis, name)(top_n=15, path=path)
+        actual = getattr(analysis, name)(top_n=15, path=path, backend="sql")
+        pd.testing.assert_series_equal(actual, expected)
+
+
+def test_monthly_unique_authors_match(path):
+    expected = analysis.monthly_unique_authors(path=path)
+    actual = analysis.monthly_unique_authors(path=path, backend="sql")
+    pd.testing.assert_series_equal(actual, expected, check_names=False)
+
+
+def test_resolution_rate_matches(path):
+    expected = analysis.analyze_resolution_rate(path=path)
+    actual = analysis.analyze_resolution_rate(path=path, backend="sql")
+    pd.testing.assert_series_equal(actual, expected, check_names=False)
+
+
+def test_user_interactions_match(path):
+    expected = analysis.analyze_user_interactions(path=path)
+    actual = analysis.analyze_user_interactions(path=path, backend="sql")
+    pd.testing.assert_frame_equal(
+        actual.reset_index(drop=True), expected.reset_index(drop=True)
+    )
+
+
+def test_sql_backend_needs_an_export(path):
+    with pytest.raises(ValueError):
+        analysis.most_active_issue_creators(df=pd.DataFrame(), backend="sql")
@@ -0,0 +1,32 @@
+import pandas as pd
+
+from aggregates import Views, build_views
+from benchmarks.synthetic import generate_frame
+from issue_writer import write_pages
+from sync import upsert_pages
+
+
+def test_item_on_two_incoming_pages_is_kept_once(tmp_path):
+    path = str(tmp_path / "issues.csv")
+    existing = generate_frame(200, seed=1)
+    write_pages(path, iter([existing]))
+    views = build_views(path)
+
+    # Updated while the crawl paged, so it comes back on a later page too
+    first = existing.iloc[:50].copy()
+    first["closed_at"] = "2024-01-10T00:00:00Z"
+    again = existing.iloc[[7]].copy()
+    again["closed_at"] = "2024-03-10T00:00:00Z"
+    new = generate_frame(20, seed=2, offset=10_000)
+
+    assert upsert_pages(path, iter([first, new, again]), views=views) == 70
+
+    df = pd.read_csv(path, dtype={"id": str})
+    assert df["id"].is_unique
+    assert len(df) == 220
+    moved = df.loc[df["id"] == str(existing["id"].iloc[7]), "closed_at"]
+    assert moved.tolist() == ["2024-03-10T00:00:00Z"]
+
+    saved, rebuilt = Views.read(path), build_views(path, save=False)
+    for name, counts in rebuilt.counts.items():
+        assert saved.counts[name].sort_index().equals(counts.sort_index()), name
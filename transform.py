@@ -0,0 +1,149 @@
+"""
+Batch transformation of fetched pages into CSV-ready columns.
+
+Instead of building each row with a chain of ``.get()`` calls and two
+``strptime`` calls, a batch of raw nodes is pulled into columns in one pass.
+Titles, timestamps and durations are then handled column-wise by pandas.
+The resulting frame matches the rows of the old row-at-a-time transforms,
+kept as benchmark baselines in ``benchmarks/baselines.py``, column for column.
+"""
+
+import numpy as np
+import pandas as pd
+
+from body_features import FEATURE_COLUMNS, body_features
+from issue_writer import COLUMNS
+from profiling import profiled
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# pandas has a fixed per-call cost that outweighs the row path on a single
+# 100-node page, so pages are regrouped into batches of this many nodes.
+BATCH_SIZE = 2000
+
+
+def batched(pages, size=BATCH_SIZE):
+    """Regroup an iterable of node pages into lists of at least ``size`` nodes."""
+    batch = []
+    for page in pages:
+        batch.extend(page)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _clean_titles(titles):
+    return titles.fillna("").str.replace("\n", " ").str.replace(",", " ")
+
+
+def _days_to_close(created_at, closed_at):
+    """Whole days between the two timestamp columns, like timedelta.days."""
+    created = pd.to_datetime(created_at, format=TIMESTAMP_FORMAT)
+    closed = pd.to_datetime(closed_at, format=TIMESTAMP_FORMAT)
+    return (closed - created).dt.days.astype("Int64")
+
+
+def _add_body_features(raw):
+    """Replace the ``body`` column by its length and FEATURE_COLUMNS."""
+    body = raw.pop("body")
+    raw["body_length"] = body.str.len().fillna(0).astype("int64")
+    raw[FEATURE_COLUMNS] = body_features(body).set_axis(raw.index)
+    return raw
+
+
+@profiled("transform")
+def rest_page_to_frame(items):
+    """Transform a page of REST issue items into a frame in COLUMNS order."""
+    records = [
+        (
+            item.get("id"),
+            item.get("number"),
+            item.get("title"),
+            item.get("state"),
+            "pull_request" in item,
+            item.get("pr_merged", False),
+            item.get("created_at"),
+            item.get("closed_at"),
+            item.get("updated_at"),
+            item.get("comments"),
+            ",".join(label["name"] for label in item.get("labels", [])),
+            (item.get("user") or {}).get("login"),
+            ",".join(assignee["login"] for assignee in item.get("assignees", [])),
+            (item.get("milestone") or {}).get("title"),
+            item.get("body"),
+            (item.get("reactions") or {}).get("total_count", 0),
+            len(item.get("pull_request", {}).get("links", [])),
+            item.get("locked", False),
+            item.get("html_url"),
+        )
+        for item in items
+    ]
+    raw = pd.DataFrame.from_records(
+        records,
+        columns=[
+            "id", "number", "title", "state", "is_pr", "merged", "created_at",
+            "closed_at", "updated_at", "comments", "labels", "author", "assignees",
+            "milestone", "body", "reactions", "linked_prs", "is_locked", "url",
+        ],
+    )
+
+    is_pr = raw["is_pr"].to_numpy(dtype=bool)
+    merged = raw["merged"].to_numpy(dtype=bool)
+    closed = (raw["state"] == "closed").to_numpy()
+    raw["title"] = _clean_titles(raw["title"])
+    raw["pr_status"] = np.select(
+        [~is_pr, merged, closed], [None, "merged", "rejected"], default="open"
+    )
+    raw["type"] = np.where(is_pr, "pull_request", "issue")
+    raw["time_to_close_days"] = _days_to_close(raw["created_at"], raw["closed_at"])
+    # Using comments as a proxy for participants
+    raw["participants_count"] = raw["comments"]
+    return _add_body_features(raw)[COLUMNS]
+
+
+@profiled("transform")
+def graphql_page_to_frame(nodes, item_type):
+    """Transform a page of GraphQL nodes of one ``item_type`` into COLUMNS order."""
+    records = [
+        (
+            node.get("id"),
+            node.get("number"),
+            node.get("title"),
+            node.get("state"),
+            node.get("merged", False),
+            node.get("createdAt"),
+            node.get("closedAt"),
+            node.get("updatedAt"),
+            node.get("comments", {}).get("totalCount", 0),
+            ",".join(
+                label["name"] for label in node.get("labels", {}).get("nodes", [])
+            ),
+            (node.get("author") or {}).get("login"),
+            ",".join(a["login"] for a in node.get("assignees", {}).get("nodes", [])),
+            (node.get("milestone") or {}).get("title"),
+            node.get("body"),
+            node.get("reactions", {}).get("totalCount", 0),
+            node.get("locked", False),
+            node.get("url"),
+        )
+        for node in nodes
+    ]
+    raw = pd.DataFrame.from_records(
+        records,
+        columns=[
+            "id", "number", "title", "state", "merged", "created_at", "closed_at",
+            "updated_at", "comments", "labels", "author", "assignees", "milestone",
+            "body", "reactions", "is_locked", "url",
+        ],
+    )
+
+    raw["title"] = _clean_titles(raw["title"])
+    unmerged = None if item_type == "issue" else "open"
+    raw["pr_status"] = np.where(raw["merged"].to_numpy(dtype=bool), "merged", unmerged)
+    raw["type"] = item_type
+    raw["time_to_close_days"] = _days_to_close(raw["created_at"], raw["closed_at"])
+    raw["linked_prs"] = 0  # linked PRs (would need additional query)
+    raw["participants_count"] = raw["comments"]
+    return _add_body_features(raw)[COLUMNS]
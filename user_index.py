@@ -0,0 +1,204 @@
+"""
+Per-user index of contributions: when each author first contributed, opened
+a first PR and opened the first PR that got merged, how long they stayed and in which
+months they were active.
+
+Newcomer, retention and community growth analyses all start from "when did
+this user first show up", which otherwise means sorting or grouping the whole
+export once per analysis. The index is built once per version of an export,
+one chunk at a time, and saved under the loader's cache directory, so later
+runs only read two small tables.
+"""
+
+import os
+import shutil
+
+import pandas as pd
+
+from loader import CACHE_DIR, file_hash, file_version, iter_issues
+
+# What the index is built from; the response time only when the export has it
+INDEX_COLUMNS = ["author", "created_at", "type", "pr_status"]
+
+# Bumped whenever the saved tables change, so older indexes are not read
+INDEX_VERSION = 2
+
+# abspath -> (version, UserIndex)
+_indexes = {}
+
+
+def month_ordinals(dates):
+    """Months counted from year 0, so two of them differ by a number of months."""
+    return dates.dt.year * 12 + dates.dt.month - 1
+
+
+def _first_rows(chunk):
+    """The earliest contribution of each author in ``chunk``, indexed by author."""
+    first = chunk.sort_values("created_at", kind="stable")
+    first = first.drop_duplicates("author").set_index("author")
+    partial = pd.DataFrame(
+        {
+            "first_contribution": first["created_at"],
+            "last_contribution": chunk.groupby("author")["created_at"].max(),
+            "contributions": chunk.groupby("author").size(),
+        }
+    )
+    for name, mask in [
+        ("first_pr", chunk["type"] == "pull_request"),
+        # The export has no merge time, only the status
+        ("first_merged_pr_opened", chunk["pr_status"] == "merged"),
+    ]:
+        partial[name] = chunk["created_at"].where(mask).groupby(chunk["author"]).min()
+    if "time_to_first_response" in chunk:
+        partial["first_response_days"] = first["time_to_first_response"]
+    return partial
+
+
+def _merge(partials):
+    """Combine the per-chunk partials into one row per author."""
+    combined = pd.concat(partials)
+    by_author = combined.groupby(level=0)
+    users = pd.DataFrame(
+        {
+            "first_contribution": by_author["first_contribution"].min(),
+            "first_pr": by_author["first_pr"].min(),
+            "first_merged_pr_opened": by_author["first_merged_pr_opened"].min(),
+            "last_contribution": by_author["last_contribution"].max(),
+            "contributions": by_author["contributions"].sum(),
+        }
+    )
+    if "first_response_days" in combined:
+        # The response to the first contribution, not the first non-null one
+        first = combined.sort_values("first_contribution", kind="stable")
+        first = first[~first.index.duplicated()]
+        users["first_response_days"] = first["first_response_days"]
+    return users
+
+
+class UserIndex:
+    """
+    Contributions per author.
+
+    Attributes:
+        users: One row per author (the index) with first_contribution,
+            first_pr, first_merged_pr_opened (when the first PR that was
+            merged was opened, not merged) and last_contribution timestamps
+            (NaT when there is none), contributions, active_days,
+            months_active and, if the export has response times,
+            first_response_days
+        activity: The distinct (author, month) pairs in which an author
+            contributed, months as ``month_ordinals``
+    """
+
+    def __init__(self, users, activity):
+        self.users = users
+        self.activity = activity
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Build from frames with INDEX_COLUMNS, e.g. ``loader.iter_issues`` chunks."""
+        partials, activity = [], []
+        for chunk in chunks:
+            chunk = chunk.dropna(subset=["author", "created_at"])
+            partials.append(_first_rows(chunk))
+            activity.append(
+                pd.DataFrame(
+                    {
+                        "author": chunk["author"],
+                        "month": month_ordinals(chunk["created_at"]).astype("int64"),
+                    }
+                ).drop_duplicates()
+            )
+        if not partials:
+            return cls.from_frame(pd.DataFrame(columns=INDEX_COLUMNS))
+
+        users = _merge(partials)
+        activity = pd.concat(activity, ignore_index=True).drop_duplicates()
+        activity = activity.sort_values(["author", "month"], ignore_index=True)
+        span = users["last_contribution"] - users["first_contribution"]
+        users["active_days"] = (span.dt.total_seconds() / (24 * 60 * 60)).astype(
+            "float32"
+        )
+        users["months_active"] = activity.groupby("author").size()
+        users.index.name = "author"
+        return cls(users, activity)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build from one in-memory frame, e.g. the report's shared one."""
+        columns = INDEX_COLUMNS + ["time_to_first_response"]
+        df = df[[c for c in columns if c in df]]
+        if df.empty:
+            df = df.astype({"created_at": "datetime64[ns, UTC]"})
+        return cls.from_chunks([df])
+
+    def first_months(self, column="first_contribution"):
+        """Users per month of their first contribution (or first PR, ...)."""
+        months = self.users[column].dropna().dt.tz_localize(None).dt.to_period("M")
+        return months.value_counts().sort_index()
+
+    def cohorts(self):
+        """Each author's first active month, as a ``month_ordinals`` Series."""
+        return self.activity.groupby("author")["month"].min()
+
+
+def user_index_path(path):
+    """Return where the index of the current contents of ``path`` is saved."""
+    # In a directory of its own, out of the way of the sidecars' cleanup
+    directory, name = os.path.split(os.path.abspath(path))
+    digest = f"{file_hash(path)[:16]}v{INDEX_VERSION}"
+    return os.path.join(directory, CACHE_DIR, "users", f"{name}.{digest}")
+
+
+def write_user_index(index, path):
+    directory = user_index_path(path)
+    os.makedirs(directory, exist_ok=True)
+    for name, frame in [("users", index.users), ("activity", index.activity)]:
+        tmp = os.path.join(directory, f"{name}.parquet.tmp")
+        frame.to_parquet(tmp, index=name == "users")
+        os.replace(tmp, os.path.join(directory, f"{name}.parquet"))
+
+    # Indexes of older versions of the same CSV can never be read again
+    parent, current = os.path.split(directory)
+    prefix = current.rsplit(".", 1)[0] + "."
+    for other in os.listdir(parent):
+        digest = other[len(prefix) :]
+        if other.startswith(prefix) and "." not in digest and other != current:
+            shutil.rmtree(os.path.join(parent, other), ignore_errors=True)
+
+
+def read_user_index(path):
+    directory = user_index_path(path)
+    return UserIndex(
+        pd.read_parquet(os.path.join(directory, "users.parquet")),
+        pd.read_parquet(os.path.join(directory, "activity.parquet")),
+    )
+
+
+def load_user_index(path, use_cache=True):
+    """
+    Return the UserIndex of the export at ``path``, built once per file
+    version and, with ``use_cache``, saved under the loader's cache directory.
+    """
+    key = os.path.abspath(path)
+    version = file_version(path)
+    cached = _indexes.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    saved = os.path.join(user_index_path(path), "activity.parquet")
+    if use_cache and os.path.exists(saved):
+        index = read_user_index(path)
+    else:
+        header = pd.read_csv(path, nrows=0).columns
+        columns = INDEX_COLUMNS + (
+            ["time_to_first_response"] if "first_response_at" in header else []
+        )
+        index = UserIndex.from_chunks(iter_issues(path, columns))
+        if use_cache:
+            try:
+                write_user_index(index, path)
+            except OSError as e:
+                print(f"Could not save the user index of {path}: {e}")
+    _indexes[key] = (version, index)
+    return index